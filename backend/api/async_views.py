@@ -0,0 +1,69 @@
+"""
+Async response bodies for the record downloads of data/ under ASGI
+(core/asgi.py, see gunicorn_asgi.py).
+
+Under ASGI Django reads a sync streaming body into memory whole before it
+sends the first byte. data/ is still answered by DatasetRecordsView, run on
+the request's thread as any sync view is under ASGI, so authentication,
+content negotiation, validators, pagination and errors all stay DRF's. Only
+the body of a streaming response (a pre-compressed payload file, or
+?stream=) is then sent from an async iterator that produces it a block at a
+time on that thread, so a download draining to a slow client waits on the
+event loop, holding neither a thread nor the whole body. For the same reason
+the uncompressed JSON list is streamed as ?stream=json is
+(``stream_json``) rather than encoded whole before the client reads any of
+it.
+
+The other read endpoints send small bodies and are plain DRF views.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.csrf import csrf_exempt
+
+from .views import DatasetRecordsView
+
+# Bytes produced per hop to the request's thread
+BLOCK_SIZE = 64 * 1024
+
+
+async def aiter_sync(iterator, block_size=None):
+    """The byte chunks of ``iterator``, joined into blocks of about ``block_size``."""
+    block_size = block_size or BLOCK_SIZE
+
+    def read():
+        parts, size = [], 0
+        for part in iterator:
+            parts.append(part)
+            size += len(part)
+            if size >= block_size:
+                break
+        return b''.join(parts)
+
+    # Thread-sensitive: a DB cursor is only used on the thread that opened it
+    read = sync_to_async(read)
+    while block := await read():
+        yield block
+
+
+def asgi_body(view, asgi_view):
+    """
+    ``view`` under WSGI; under ASGI ``asgi_view``, both sync views, with its
+    streaming bodies sent asynchronously.
+    """
+    asgi_view = sync_to_async(asgi_view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return await sync_to_async(view)(request, *args, **kwargs)
+        response = await asgi_view(request, *args, **kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = aiter_sync(iter(response.streaming_content))
+        return response
+    # As DRF views are
+    return csrf_exempt(wrapper)
+
+
+dataset_records = asgi_body(DatasetRecordsView.as_view(), DatasetRecordsView.as_view(stream_json=True))
@@ -0,0 +1,39 @@
+"""
+Authentication for the async events view (api.events), which runs outside
+DRF's request cycle: a token is looked up with the async ORM, a
+session through ``request.auser()``, and an events ticket by its signature.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from rest_framework.authtoken.models import Token
+
+TICKET_SALT = 'api.events.ticket'
+
+
+async def token_user(key):
+    """The active user owning the token ``key``, else None."""
+    token = await Token.objects.select_related('user').filter(key=key).afirst()
+    return token.user if token and token.user.is_active else None
+
+
+async def session_user(request):
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def make_ticket(user):
+    """
+    A signed ticket for ``user``, good for EVENTS_TICKET_SECONDS: EventSource
+    cannot set headers, and the token itself must not end up in a URL.
+    """
+    return signing.dumps(user.id, salt=TICKET_SALT)
+
+
+async def ticket_user(ticket):
+    """The active user ``ticket`` was made for, unless it is forged or expired."""
+    try:
+        user_id = signing.loads(ticket, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+    return await User.objects.filter(id=user_id, is_active=True).afirst()
@@ -0,0 +1,136 @@
+"""
+Chart images for the PDF report.
+
+Everything goes through the object-oriented ``Figure`` / Agg canvas API, so
+nothing touches pyplot's global figure manager, and the report style is
+applied to rcParams once, at import. Each chart is a template: a figure with
+its axes, titles and styling built once per thread, of which only the plotted
+data is swapped between renders. The functions are therefore safe to call
+from several threads at once.
+
+They take plain, pre-aggregated data and return PNG bytes, and this module
+imports nothing from Django, so they also run in the report process pool
+(see ``api.reports.chart_pool``).
+"""
+import io
+import threading
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+
+STYLE = 'seaborn-v0_8-whitegrid'
+DPI = 150
+TEAL = '#0d9488'
+AMBER = '#f59e0b'
+DONUT_COLORS = ['#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4']
+
+# Figures read rcParams when they are built, so this is the only write to them
+matplotlib.style.use(STYLE)
+
+
+class ChartTemplate:
+    """A figure whose layout is built once; ``render`` only redraws its data."""
+
+    def __init__(self, figsize, build):
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        self.axes = build(self.figure)
+        self.subplotpars = vars(self.figure.subplotpars).copy()
+
+    def clear(self):
+        # tight_layout starts from the current positions, so restore the
+        # built layout first or each render would drift from the last
+        self.figure.subplots_adjust(**self.subplotpars)
+        for ax in self.axes:
+            for artist in [*ax.lines, *ax.collections, *ax.patches, *ax.texts]:
+                artist.remove()
+            if ax.get_legend() is not None:
+                ax.get_legend().remove()
+            # Forget the previous data limits before plotting new data
+            ax.relim()
+            ax.autoscale()
+            ax.set_position(ax.get_subplotspec().get_position(self.figure))
+
+    def render(self, draw, *args):
+        self.clear()
+        draw(*self.axes, *args)
+        self.figure.tight_layout()
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+        return buffer.getvalue()
+
+
+def _build_trend(figure):
+    ax = figure.subplots()
+    ax.set_title('Process Trends Overview', fontsize=12, pad=10, fontweight='bold', color='#333333')
+    ax.set_ylabel('Value', fontsize=9)
+    ax.tick_params(axis='both', which='major', labelsize=8)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    return (ax,)
+
+
+def _draw_trend(ax, flow, press):
+    ax.plot(flow['x'], flow['y'], label='Flowrate', color=TEAL, linewidth=1.5, alpha=0.9)
+    ax.fill_between(flow['x'], flow['y'], color=TEAL, alpha=0.1)
+    ax.plot(press['x'], press['y'], label='Pressure', color=AMBER, linestyle='--', linewidth=1.5)
+    ax.margins(x=0)
+    ax.legend(frameon=True, fontsize=9)
+
+
+def _build_distribution(figure):
+    ax1, ax2 = figure.subplots(1, 2)
+    ax1.set_title('Equipment Distribution', fontsize=10, fontweight='bold')
+    ax2.set_title('Avg Flowrate by Type', fontsize=10, fontweight='bold')
+    ax2.tick_params(axis='x', rotation=45, labelsize=8)
+    ax2.grid(axis='y', linestyle='--', alpha=0.5)
+    for spine in ax2.spines.values():
+        spine.set_visible(False)
+    return ax1, ax2
+
+
+def _draw_distribution(ax1, ax2, type_distribution, flow_by_type):
+    counts = sorted(type_distribution.items(), key=lambda item: item[1], reverse=True)
+    ax1.pie([count for _, count in counts], labels=[label for label, _ in counts],
+            autopct='%1.1f%%', colors=DONUT_COLORS[:len(counts)],
+            textprops={'fontsize': 8}, startangle=90, pctdistance=0.85)
+    # Draw circle for donut chart
+    ax1.add_artist(Circle((0, 0), 0.70, fc='white'))
+
+    # Numeric positions rather than category units, which would keep
+    # the previous render's types on the reused axis
+    labels = list(flow_by_type)
+    positions = range(len(labels))
+    ax2.bar(positions, list(flow_by_type.values()), color=TEAL, alpha=0.8, width=0.6)
+    ax2.set_xticks(positions, labels)
+
+
+TEMPLATES = {
+    'trend': ((8, 3.5), _build_trend, _draw_trend),
+    'distribution': ((8, 3.5), _build_distribution, _draw_distribution),
+}
+
+_local = threading.local()
+
+
+def _render(name, *args):
+    # One figure per template per thread: figures themselves are not thread-safe
+    templates = _local.__dict__.setdefault('templates', {})
+    figsize, build, draw = TEMPLATES[name]
+    if name not in templates:
+        templates[name] = ChartTemplate(figsize, build)
+    return templates[name].render(draw, *args)
+
+
+def trend_chart(flow, press):
+    """Flowrate and pressure trends from downsampled ``{'x', 'y'}`` series."""
+    return _render('trend', flow, press)
+
+
+def distribution_charts(type_distribution, flow_by_type):
+    """Equipment-type donut next to average flowrate per type, from summary dicts."""
+    return _render('distribution', type_distribution, flow_by_type)
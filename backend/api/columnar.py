@@ -0,0 +1,255 @@
+"""
+Columnar sidecar store for ingested datasets.
+
+Next to every uploaded ``foo.csv`` the ingest writes a ``foo.columns/``
+directory holding one raw little-endian array per column plus a
+``meta.json`` describing them:
+
+    flowrate.f8, pressure.f8, temperature.f8   float64 metrics
+    type.i4, name.i4                           int32 dictionary codes
+    meta.json                                  row count and code labels
+
+Readers memory-map the arrays, so column scans are zero-copy NumPy
+operations and every worker process shares the same page cache.
+"""
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+METRICS = ('flowrate', 'pressure', 'temperature')
+# 2: blank labels are coded as 'nan', as in the label tables, rather than -1
+FORMAT_VERSION = 2
+
+
+def normalize_labels(values):
+    """Equipment labels as stored, by the DB tables and the sidecar alike.
+
+    Missing cells become 'nan', as the old CharFields stored them; pandas 3
+    string columns keep NaN through astype(str), so it is filled explicitly.
+    """
+    return values.fillna('nan').astype(str)
+
+
+def sidecar_dir(csv_path):
+    return os.path.splitext(csv_path)[0] + '.columns'
+
+
+def dataset_sidecar_dir(dataset):
+    if not dataset.file:
+        return None
+    return sidecar_dir(dataset.file.path)
+
+
+def remove_sidecar(dataset):
+    path = dataset_sidecar_dir(dataset)
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class _Dictionary:
+    """Incrementally assigns int32 codes to string labels across chunks."""
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def encode(self, values):
+        local_codes, uniques = pd.factorize(normalize_labels(values))
+        mapping = np.array([self._code(label) for label in uniques], dtype=np.int32)
+        return mapping[local_codes] if len(mapping) else np.empty(0, dtype=np.int32)
+
+    def _code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class ColumnWriter:
+    """Streams ingest chunks into a sidecar directory.
+
+    Everything is written into a temporary directory that only replaces the
+    final one on ``close()``, so readers never see a half-written store.
+    """
+
+    def __init__(self, csv_path):
+        self.path = sidecar_dir(csv_path)
+        self.tmp_path = self.path + '.tmp'
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.rows = 0
+        self.types = _Dictionary()
+        self.names = _Dictionary()
+        self._files = {
+            'flowrate': open(os.path.join(self.tmp_path, 'flowrate.f8'), 'wb'),
+            'pressure': open(os.path.join(self.tmp_path, 'pressure.f8'), 'wb'),
+            'temperature': open(os.path.join(self.tmp_path, 'temperature.f8'), 'wb'),
+            'type': open(os.path.join(self.tmp_path, 'type.i4'), 'wb'),
+            'name': open(os.path.join(self.tmp_path, 'name.i4'), 'wb'),
+        }
+
+    def append(self, df):
+        """Append a chunk with the CSV's column headers (see api.ingest)."""
+        for metric, column in (('flowrate', 'Flowrate'), ('pressure', 'Pressure'),
+                               ('temperature', 'Temperature')):
+            df[column].to_numpy(dtype='<f8').tofile(self._files[metric])
+        self.types.encode(df['Type']).astype('<i4').tofile(self._files['type'])
+        self.names.encode(df['Equipment Name']).astype('<i4').tofile(self._files['name'])
+        self.rows += len(df)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'rows': self.rows,
+                'type_labels': self.types.labels,
+                'name_labels': self.names.labels,
+            }, f)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Remove the store, also once closed: payloads written into it included."""
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Columns:
+    """Read-only, memory-mapped view over a dataset's sidecar."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.rows = meta['rows']
+        self.type_labels = meta['type_labels']
+        self.name_labels = meta['name_labels']
+        self.flowrate = self._map('flowrate.f8', '<f8')
+        self.pressure = self._map('pressure.f8', '<f8')
+        self.temperature = self._map('temperature.f8', '<f8')
+        self.type_codes = self._map('type.i4', '<i4')
+        self.name_codes = self._map('name.i4', '<i4')
+
+    def __len__(self):
+        return self.rows
+
+    def _map(self, filename, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def metric(self, name):
+        return getattr(self, name)
+
+    def types(self):
+        return pd.Categorical.from_codes(self.type_codes, categories=self.type_labels)
+
+    def names(self):
+        return pd.Categorical.from_codes(self.name_codes, categories=self.name_labels)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'equipment_name': self.names(),
+            'equipment_type': self.types(),
+            'flowrate': self.flowrate,
+            'pressure': self.pressure,
+            'temperature': self.temperature,
+        })
+
+
+def load_columns(dataset):
+    """Memory-map the sidecar of ``dataset``, or return None if it has none."""
+    path = dataset_sidecar_dir(dataset)
+    if not path:
+        return None
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != FORMAT_VERSION:
+        return None
+    return Columns(path, meta)
+
+
+def load_frame(dataset):
+    """All records of ``dataset`` as a DataFrame, preferring the sidecar."""
+    columns = load_columns(dataset)
+    if columns is not None:
+        return columns.to_frame()
+    return pd.DataFrame(
+        list(dataset.records.order_by('id').values_list(
+            'equipment_name__name', 'equipment_type__name', *METRICS)),
+        columns=['equipment_name', 'equipment_type', *METRICS],
+    )
+
+
+def iter_rows(dataset, limit=None, chunk_size=2000):
+    """Yield ``(equipment_name, equipment_type, *METRICS)`` tuples in id order.
+
+    Reads ``chunk_size`` rows at a time from the sidecar, or from a DB
+    cursor when there is none, so memory stays flat however many rows are
+    requested. ``limit`` stops after that many rows.
+    """
+    columns = load_columns(dataset)
+    if columns is None:
+        rows = dataset.records.order_by('id').values_list(
+            'equipment_name__name', 'equipment_type__name', *METRICS)
+        if limit is not None:
+            rows = rows[:limit]
+        yield from rows.iterator(chunk_size=chunk_size)
+        return
+
+    end = len(columns) if limit is None else min(limit, len(columns))
+    names = np.array(columns.name_labels, dtype=object)
+    types = np.array(columns.type_labels, dtype=object)
+    for start in range(0, end, chunk_size):
+        stop = min(start + chunk_size, end)
+        yield from zip(
+            names[columns.name_codes[start:stop]].tolist(),
+            types[columns.type_codes[start:stop]].tolist(),
+            *(columns.metric(m)[start:stop].tolist() for m in METRICS),
+        )
+
+
+def npz_payload(dataset, queryset):
+    """Encode the records in ``queryset`` as an uncompressed ``.npz`` archive.
+
+    Holds ``id``, ``dataset`` and the three metrics as plain arrays, and
+    equipment names and types dictionary-encoded as ``<field>_codes``
+    (int32) plus ``<field>_labels``.
+    """
+    arrays = {'dataset': np.asarray(dataset.id, dtype=np.int64)}
+    columns = load_columns(dataset)
+    if columns is not None:
+        # Sidecar rows are in insertion order, i.e. ordered by id
+        arrays['id'] = np.fromiter(queryset.order_by('id').values_list('id', flat=True),
+                                   dtype=np.int64, count=len(columns))
+        arrays['equipment_name_codes'] = np.asarray(columns.name_codes)
+        arrays['equipment_name_labels'] = np.asarray(columns.name_labels, dtype=str)
+        arrays['equipment_type_codes'] = np.asarray(columns.type_codes)
+        arrays['equipment_type_labels'] = np.asarray(columns.type_labels, dtype=str)
+        for metric in METRICS:
+            arrays[metric] = np.asarray(columns.metric(metric))
+    else:
+        rows = list(queryset.order_by('id').values_list(
+            'id', 'equipment_name__name', 'equipment_type__name', *METRICS))
+        ids, names, types, *metrics = zip(*rows) if rows else ((),) * 6
+        arrays['id'] = np.asarray(ids, dtype=np.int64)
+        for field, values in (('equipment_name', names), ('equipment_type', types)):
+            codes, labels = pd.factorize(pd.Series(values, dtype=object))
+            arrays[f'{field}_codes'] = codes.astype(np.int32)
+            arrays[f'{field}_labels'] = np.asarray(labels, dtype=str)
+        for metric, values in zip(METRICS, metrics):
+            arrays[metric] = np.asarray(values, dtype=np.float64)
+
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
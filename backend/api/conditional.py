@@ -0,0 +1,73 @@
+"""
+Conditional GETs for the dataset read endpoints.
+
+A READY dataset never changes, so its validators come from small indexed
+lookups instead of the data: the dataset row for data/ and pdf/, the
+summary's ``computed_at`` for stats/, and the ids of the listed datasets for
+the list endpoints. ``not_modified`` answers ``If-None-Match`` /
+``If-Modified-Since`` with a 304 before the response is built.
+
+ETags are strong: they hash everything the representation depends on,
+including the query string and the ``Accept`` / ``Accept-Encoding`` headers
+the response varies on.
+"""
+import hashlib
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import DatasetSummary
+
+
+def make_etag(request, *parts):
+    variant = (request.path, request.META.get('QUERY_STRING', ''),
+               request.META.get('HTTP_ACCEPT', ''), request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    digest = hashlib.sha256(repr((*variant, *parts)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Cacheable per user, but always revalidated rather than assumed fresh
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 carrying the validators if the client's copy is current, else None."""
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def dataset_validators(request, dataset, *parts):
+    """Validators of a READY dataset's immutable representations."""
+    return make_etag(request, dataset.id, dataset.uploaded_at, *parts), dataset.uploaded_at
+
+
+def summary_validators(request, dataset_id):
+    """Validators of the stored summary, or ``(None, None)`` if there is none yet."""
+    computed_at = (DatasetSummary.objects.filter(pk=dataset_id)
+                   .values_list('computed_at', flat=True).first())
+    if computed_at is None:
+        return None, None
+    return make_etag(request, dataset_id, computed_at), computed_at
+
+
+def list_validators(request, queryset, jobs):
+    """
+    Validators of a dataset list: the listed ids, and the latest upload or
+    finished ``jobs`` entry. Datasets only appear when their ingest job
+    finishes and disappear through retention jobs, so deletions also move
+    Last-Modified forward.
+    """
+    listed = list(queryset.order_by('id').values_list('id', 'uploaded_at'))
+    times = [uploaded_at for _, uploaded_at in listed]
+    times.append(jobs.aggregate(latest=Max('finished_at'))['latest'])
+    times = [t for t in times if t is not None]
+    if not times:
+        return None, None
+    return make_etag(request, [dataset_id for dataset_id, _ in listed]), max(times)
@@ -0,0 +1,95 @@
+"""
+Shape-preserving downsampling of per-row metric series for trend charts.
+
+Series are plotted against the row index, so only the y values are stored;
+both methods return ``(x, y)`` with ``x`` the indices of the kept rows.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from .columnar import METRICS, load_columns
+
+METHODS = ('lttb', 'minmax')
+DEFAULT_POINTS = 1000
+MAX_POINTS = 10000
+
+
+def lttb(y, points):
+    """Largest-Triangle-Three-Buckets: keeps the point of each bucket that
+    forms the largest triangle with the previous pick and the next bucket's
+    mean. Bucket means are computed for all buckets at once; each bucket's
+    pick is a vectorized argmax over its slice."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n), y
+
+    # Bucket i covers [edges[i], edges[i + 1]); first and last rows stand alone
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    bucket_x = np.add.reduceat(np.arange(n - 1, dtype=float), edges[:-1]) / sizes
+    bucket_y = np.add.reduceat(y[:-1], edges[:-1]) / sizes
+    # The point after the last bucket is the final row itself
+    next_x = np.append(bucket_x[1:], n - 1)
+    next_y = np.append(bucket_y[1:], y[-1])
+
+    picked = np.empty(points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - next_x[i]) * (y[lo:hi] - y[a]) - (a - xs) * (next_y[i] - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked, y[picked]
+
+
+def minmax(y, points):
+    """Keep the minimum and maximum of each of ``points // 2`` equal buckets."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    buckets = max(points // 2, 1)
+    if 2 * buckets >= n:
+        return np.arange(n), y
+
+    starts = np.arange(buckets) * n // buckets
+    sizes = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(buckets), sizes)
+
+    def first_match(extremes):
+        # Index of the first row in each bucket equal to that bucket's extreme
+        hits = np.flatnonzero(y == np.repeat(extremes, sizes))
+        _, first = np.unique(bucket[hits], return_index=True)
+        return hits[first]
+
+    picked = np.union1d(first_match(np.minimum.reduceat(y, starts)),
+                        first_match(np.maximum.reduceat(y, starts)))
+    return picked, y[picked]
+
+
+def trend_series(dataset, metric, points=DEFAULT_POINTS, method='lttb'):
+    """Downsampled ``(x, y)`` lists for one metric; cached since datasets are immutable."""
+    key = f'trend:{dataset.id}:{metric}:{method}:{points}'
+    series = cache.get(key)
+    if series is None:
+        columns = load_columns(dataset)
+        if columns is not None:
+            values = columns.metric(metric)
+        else:
+            values = np.fromiter(dataset.records.order_by('id').values_list(metric, flat=True), dtype=float)
+        x, y = (lttb if method == 'lttb' else minmax)(values, points)
+        series = {'x': x.tolist(), 'y': y.tolist()}
+        cache.set(key, series, timeout=None)
+    return series
+
+
+def parse_metrics(value):
+    if not value:
+        return list(METRICS)
+    metrics = [m.strip() for m in value.split(',') if m.strip()]
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+    return metrics
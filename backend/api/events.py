@@ -0,0 +1,187 @@
+"""
+Per-user change notifications as server-sent events (GET /api/events/).
+
+A user's dataset list only changes when one of their jobs finishes: an
+ingest makes its dataset READY (or FAILED) and a retention sweep deletes old
+ones. Finished jobs are therefore the only events there are, and they are
+read from the api_job table (a range scan on the Job.finished_at index), so
+jobs run by separate ``manage.py run_job_worker`` processes are seen too,
+without a broker.
+
+Under ASGI (core/asgi.py) one poller per process reads them and fans them
+out to the open streams of each job's user, so an idle connection costs an
+asyncio queue, not a thread or a query. Under WSGI (runserver) each stream
+polls on its own for ``EVENTS_SYNC_STREAM_SECONDS`` and then ends.
+
+Browsers connect with a ``?ticket=`` from POST /api/events/ticket/, signed
+and valid for ``EVENTS_TICKET_SECONDS``, so the long-lived token stays out of
+URLs and access logs. A ticket only needs to outlive the connect: once it has
+expired, the client fetches a new one to reconnect.
+
+Each finished job is sent as a ``job`` event; those that can change the
+dataset list are followed by a ``datasets`` event, so clients only refetch
+the list when it changed.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .authentication import session_user, ticket_user, token_user
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# A job commits a moment after the finish time it records, so each read goes
+# this far back and skips the jobs already sent
+OVERLAP = timedelta(seconds=5)
+JOB_FIELDS = ('id', 'kind', 'status', 'user_id', 'dataset_id', 'finished_at')
+LIST_CHANGING = (Job.Kind.INGEST, Job.Kind.RETENTION)
+
+
+class FinishedJobs:
+    """A cursor over jobs in the order they finish, optionally for one user."""
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self.since = timezone.now()
+        self.seen = {}
+
+    def query(self):
+        jobs = Job.objects.filter(finished_at__gte=self.since - OVERLAP)
+        if self.user_id is not None:
+            jobs = jobs.filter(user_id=self.user_id)
+        return jobs.order_by('finished_at', 'id').values(*JOB_FIELDS)
+
+    def take(self, rows):
+        new = [row for row in rows if row['id'] not in self.seen]
+        for row in new:
+            self.seen[row['id']] = row['finished_at']
+            self.since = max(self.since, row['finished_at'])
+        horizon = self.since - OVERLAP
+        self.seen = {job_id: at for job_id, at in self.seen.items() if at >= horizon}
+        return new
+
+    def read(self):
+        return self.take(list(self.query()))
+
+    async def aread(self):
+        return self.take([row async for row in self.query()])
+
+
+def format_events(job):
+    data = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'dataset': job['dataset_id'],
+        'finished_at': job['finished_at'].isoformat(),
+    }
+    chunk = f"event: job\ndata: {json.dumps(data)}\n\n"
+    if job['kind'] in LIST_CHANGING:
+        chunk += f"event: datasets\ndata: {json.dumps({'job_id': job['id']})}\n\n"
+    return chunk
+
+
+def retry_field():
+    # How long EventSource waits before reconnecting, in milliseconds
+    return f"retry: {int(settings.EVENTS_RETRY_SECONDS * 1000)}\n\n"
+
+
+class EventHub:
+    """Polls finished jobs for as long as any stream in this process is open."""
+
+    def __init__(self):
+        self.queues = {}
+        self.task = None
+        self.jobs = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue()
+        self.queues.setdefault(user_id, set()).add(queue)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.jobs = FinishedJobs()
+            self.task = loop.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.queues.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.queues.pop(user_id, None)
+
+    async def run(self):
+        while self.queues:
+            try:
+                jobs = await self.jobs.aread()
+            except Exception:
+                logger.exception("Polling finished jobs failed")
+                jobs = []
+            for job in jobs:
+                for queue in self.queues.get(job['user_id'], ()):
+                    queue.put_nowait(job)
+            await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
+
+
+hub = EventHub()
+
+
+async def async_stream(user_id):
+    queue = hub.subscribe(user_id)
+    try:
+        yield retry_field()
+        while True:
+            try:
+                job = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+            else:
+                yield format_events(job)
+    finally:
+        # Also reached when the client disconnects and the stream is cancelled
+        hub.unsubscribe(user_id, queue)
+
+
+def sync_stream(user_id):
+    jobs = FinishedJobs(user_id)
+    deadline = time.monotonic() + settings.EVENTS_SYNC_STREAM_SECONDS
+    yield retry_field()
+    while time.monotonic() < deadline:
+        time.sleep(settings.EVENTS_POLL_INTERVAL)
+        for job in jobs.read():
+            yield format_events(job)
+
+
+async def authenticate(request):
+    # EventSource cannot set headers, so browsers pass a ticket from
+    # events/ticket/ as ?ticket=; the token itself never goes in the URL
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return await ticket_user(ticket)
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        return await token_user(header[len('Token '):])
+    return await session_user(request)
+
+
+async def dataset_events(request):
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    if isinstance(request, ASGIRequest):
+        stream = async_stream(user.id)
+    else:
+        stream = sync_stream(user.id)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,65 @@
+"""
+Binned metric distributions, optionally split by equipment type.
+
+Bins are shared by all types of a metric so the per-type counts line up;
+every count comes from one ``np.bincount`` over (type, bin) pairs.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from .stats import dataset_arrays
+
+MODES = ('width', 'quantile')
+DEFAULT_BINS = 20
+MAX_BINS = 500
+
+
+def bin_edges(values, bins, mode='width'):
+    if not len(values):
+        return np.linspace(0, 1, bins + 1)
+    if mode == 'quantile':
+        # Equal-population bins; collapse repeated edges from heavy ties
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)))
+        return edges if len(edges) > 1 else np.array([edges[0], edges[0] + 1])
+    return np.histogram_bin_edges(values, bins=bins)
+
+
+def bin_counts(values, edges, codes=None, groups=0):
+    """Counts per bin, or a ``(groups, bins)`` matrix when ``codes`` is given."""
+    nbins = len(edges) - 1
+    # Right-most edge is inclusive, like np.histogram
+    index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, nbins - 1)
+    if codes is None:
+        return np.bincount(index, minlength=nbins)
+    flat = codes.astype(np.int64) * nbins + index
+    return np.bincount(flat, minlength=groups * nbins).reshape(groups, nbins)
+
+
+def compute_histograms(dataset, metrics, bins=DEFAULT_BINS, mode='width', by_type=False):
+    values_by_metric, codes, labels = dataset_arrays(dataset)
+    codes = np.asarray(codes)
+    result = {}
+    for metric in metrics:
+        values = np.asarray(values_by_metric[metric], dtype=float)
+        edges = bin_edges(values, bins, mode)
+        entry = {
+            'edges': edges.tolist(),
+            'counts': bin_counts(values, edges).tolist(),
+        }
+        if by_type:
+            matrix = bin_counts(values, edges, codes, len(labels))
+            entry['by_type'] = {label: matrix[code].tolist()
+                                for code, label in sorted(enumerate(labels), key=lambda item: item[1])
+                                if matrix[code].any()}
+        result[metric] = entry
+    return result
+
+
+def histograms(dataset, metrics, bins=DEFAULT_BINS, mode='width', by_type=False):
+    """Cached ``compute_histograms``; datasets are immutable after ingest."""
+    key = f'histogram:{dataset.id}:{",".join(metrics)}:{bins}:{mode}:{int(by_type)}'
+    result = cache.get(key)
+    if result is None:
+        result = compute_histograms(dataset, metrics, bins, mode, by_type)
+        cache.set(key, result, timeout=None)
+    return result
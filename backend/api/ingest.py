@@ -0,0 +1,153 @@
+import logging
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .columnar import ColumnWriter, normalize_labels
+from .models import EquipmentName, EquipmentRecord, EquipmentType
+from .payloads import write_payloads
+from .stats import save_summary
+
+logger = logging.getLogger(__name__)
+
+# Expected columns: "Equipment Name,Type,Flowrate,Pressure,Temperature"
+CSV_DTYPES = {
+    'Equipment Name': str,
+    'Type': str,
+    'Flowrate': 'float64',
+    'Pressure': 'float64',
+    'Temperature': 'float64',
+}
+
+
+@dataclass
+class IngestResult:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def read_equipment_csv(path, **kwargs):
+    # Explicit dtypes skip pandas' type inference pass and only the five
+    # columns we store are parsed.
+    return pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, **kwargs)
+
+
+class LabelKeys:
+    """Resolves the strings of one label table (EquipmentType, EquipmentName)
+    to their keys, remembering them across the chunks of an ingest so each
+    distinct label costs one bulk lookup at most."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def encode(self, values):
+        # The same labels the sidecar codes, blanks included
+        values = normalize_labels(values)
+        missing = [label for label in values.unique() if label not in self.ids]
+        if missing:
+            self.ids.update(self.model.ids_for(missing))
+        return values.map(self.ids).tolist()
+
+
+def build_records(dataset_id, df, names, types):
+    # Pull each column out as a plain Python list once instead of boxing a
+    # Series per row like df.iterrows() does; ``names`` and ``types`` are
+    # the ingest's LabelKeys.
+    return [
+        EquipmentRecord(
+            dataset_id=dataset_id,
+            equipment_name_id=name,
+            equipment_type_id=eq_type,
+            flowrate=flow,
+            pressure=press,
+            temperature=temp,
+        )
+        for name, eq_type, flow, press, temp in zip(
+            names.encode(df['Equipment Name']),
+            types.encode(df['Type']),
+            df['Flowrate'].tolist(),
+            df['Pressure'].tolist(),
+            df['Temperature'].tolist(),
+        )
+    ]
+
+
+def iter_chunks(path, chunk_size):
+    if not chunk_size:
+        yield read_equipment_csv(path)
+        return
+    with read_equipment_csv(path, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def count_rows(path):
+    # Cheap line count so job progress can be reported as a fraction
+    lines, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def ingest_csv(dataset, path, batch_size=None, chunk_size=None, progress=None, write_columns=True):
+    """Parse ``path`` and insert its rows as records of ``dataset``.
+
+    The file is streamed ``chunk_size`` rows at a time (0 reads it whole) and
+    each chunk is inserted before the next is parsed, so peak memory is
+    bounded by the chunk rather than the file. Each chunk commits on its own
+    so ``progress(rows)`` can be reported to other connections; if any step
+    fails, the rows and sidecar already written for the dataset are deleted
+    again, and if the process dies, api.jobs.reap_stale deletes them.
+
+    Unless ``write_columns`` is False, the same chunks are also written to
+    the columnar sidecar next to ``path`` (see api.columnar), along with the
+    pre-compressed JSON payloads of api.payloads. The dataset's
+    DatasetSummary is computed once all rows are in.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    if chunk_size is None:
+        chunk_size = settings.INGEST_CHUNK_SIZE
+    started = time.perf_counter()
+
+    writer = ColumnWriter(path) if write_columns else None
+    names, types = LabelKeys(EquipmentName), LabelKeys(EquipmentType)
+    rows = 0
+    try:
+        for chunk in iter_chunks(path, chunk_size):
+            records = build_records(dataset.id, chunk, names, types)
+            with transaction.atomic():
+                EquipmentRecord.objects.bulk_create(records, batch_size=batch_size)
+            if writer:
+                writer.append(chunk)
+            rows += len(records)
+            del records, chunk
+            if progress:
+                progress(rows)
+        if writer:
+            writer.close()
+            write_payloads(EquipmentRecord.objects.filter(dataset_id=dataset.id), writer.path)
+        save_summary(dataset)
+    except Exception:
+        if writer:
+            writer.abort()
+        if rows:
+            EquipmentRecord.delete_for_dataset(dataset.id)
+        raise
+
+    result = IngestResult(rows=rows, seconds=time.perf_counter() - started)
+    logger.info(
+        "Ingested %d rows into dataset %s in %.2fs (%.0f rows/s)",
+        result.rows, dataset.id, result.seconds, result.rows_per_second,
+    )
+    return result
@@ -0,0 +1,172 @@
+"""
+Background job queue backed by the api_job table.
+
+Jobs are claimed with a conditional UPDATE, so any number of worker threads
+(the in-process pool below) or worker processes (``manage.py run_job_worker``)
+can drain the same queue without an external broker.
+
+A running job moves its ``heartbeat_at`` on as it makes progress. Every
+drain first fails the RUNNING jobs whose heartbeat is older than
+``JOB_STALE_MINUTES``, as their worker was killed, and removes what their
+ingest had written; otherwise its dataset would stay PENDING, and its rows
+in the table, forever.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .columnar import remove_sidecar
+from .ingest import count_rows, ingest_csv
+from .models import Dataset, EquipmentRecord, Job
+from .reports import get_report
+from .retention import sweep
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOB_WORKERS, thread_name_prefix='chemviz-job'
+            )
+        return _executor
+
+
+def enqueue(kind, user, dataset=None, params=None):
+    job = Job.objects.create(kind=kind, user=user, dataset=dataset, params=params or {})
+    if settings.JOB_RUN_IN_PROCESS:
+        # Only wake a worker once the job row is visible to other connections
+        transaction.on_commit(lambda: get_executor().submit(drain))
+    return job
+
+
+def claim_next():
+    while True:
+        job_id = (
+            Job.objects.filter(status=Job.Status.QUEUED)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(id=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.select_related('dataset').get(id=job_id)
+        # Another worker won the race for this job; try the next one
+
+
+class JobReaped(Exception):
+    """Raised in a worker whose job was failed by ``reap_stale`` meanwhile."""
+
+
+def heartbeat(job, **fields):
+    """Record progress; raises JobReaped if the job is no longer ours."""
+    if not Job.objects.filter(id=job.id, status=Job.Status.RUNNING).update(heartbeat_at=timezone.now(), **fields):
+        raise JobReaped(f"Job {job.id} was failed as stale")
+
+
+def run_job(job):
+    handler = HANDLERS[job.kind]
+    # Only a job still RUNNING is finished here; a reaped one stays FAILED
+    running = Job.objects.filter(id=job.id, status=Job.Status.RUNNING)
+    try:
+        handler(job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.id, job.kind)
+        running.update(status=Job.Status.FAILED, error=str(e), finished_at=timezone.now())
+    else:
+        running.update(status=Job.Status.DONE, finished_at=timezone.now())
+
+
+def fail_ingest(dataset):
+    """Remove what an unfinished ingest wrote and mark its dataset FAILED."""
+    EquipmentRecord.delete_for_dataset(dataset.id)
+    # The sidecar and its payloads, if the ingest got as far as closing it
+    remove_sidecar(dataset)
+    dataset.file.delete(save=False)
+    Dataset.objects.filter(id=dataset.id).update(status=Dataset.Status.FAILED, file='')
+
+
+def reap_stale(stale_minutes=None):
+    """Fail RUNNING jobs whose worker stopped reporting. Returns how many."""
+    stale_minutes = settings.JOB_STALE_MINUTES if stale_minutes is None else stale_minutes
+    cutoff = timezone.now() - timedelta(minutes=stale_minutes)
+    stale = Job.objects.filter(status=Job.Status.RUNNING, heartbeat_at__lt=cutoff)
+    reaped = 0
+    for job in stale.select_related('dataset'):
+        # Conditional, like claim_next, so two reapers fail each job once
+        if not stale.filter(id=job.id).update(status=Job.Status.FAILED, finished_at=timezone.now(),
+                                              error="The worker stopped before the job finished"):
+            continue
+        reaped += 1
+        logger.warning("Job %s (%s) had no heartbeat for %d minutes; failed", job.id, job.kind, stale_minutes)
+        if job.kind == Job.Kind.INGEST and job.dataset and job.dataset.status == Dataset.Status.PENDING:
+            fail_ingest(job.dataset)
+    return reaped
+
+
+def drain():
+    """Run queued jobs until the queue is empty. Returns how many ran."""
+    ran = 0
+    try:
+        reap_stale()
+        while (job := claim_next()) is not None:
+            run_job(job)
+            ran += 1
+    finally:
+        # Pool threads outlive the request cycle that normally closes these
+        connection.close()
+    return ran
+
+
+# --- HANDLERS ---
+
+def run_ingest(job):
+    dataset = job.dataset
+    path = dataset.file.path
+    heartbeat(job, rows_total=count_rows(path))
+
+    def progress(rows):
+        heartbeat(job, rows_processed=rows)
+
+    try:
+        ingest_csv(dataset, path, progress=progress)
+    except JobReaped:
+        # The reaper has already cleaned up after this ingest
+        raise
+    except Exception:
+        fail_ingest(dataset)
+        raise
+    Dataset.objects.filter(id=dataset.id, status=Dataset.Status.PENDING).update(status=Dataset.Status.READY)
+    # Older datasets are swept by their own job, not on the upload's time
+    enqueue(Job.Kind.RETENTION, job.user)
+
+
+def run_report(job):
+    # Renders into the report cache; the download view serves it from there
+    get_report(job.dataset, job.params.get('charts'))
+
+
+def run_retention(job):
+    sweep(user=job.user)
+
+
+HANDLERS = {
+    Job.Kind.INGEST: run_ingest,
+    Job.Kind.REPORT: run_report,
+    Job.Kind.RETENTION: run_retention,
+}
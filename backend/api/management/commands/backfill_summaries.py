@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Dataset
+from api.stats import save_summary
+
+
+class Command(BaseCommand):
+    help = "Compute the DatasetSummary of datasets ingested before summaries existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute summaries that already exist as well.")
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.filter(status=Dataset.Status.READY).order_by('id')
+        if not options['all']:
+            datasets = datasets.filter(summary__isnull=True)
+
+        done = 0
+        for dataset in datasets.iterator():
+            save_summary(dataset)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f"Summarized {done} dataset(s)"))
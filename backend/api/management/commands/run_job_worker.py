@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import drain
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (ingest, ...) outside the web process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            ran = drain()
+            if ran:
+                self.stdout.write(f"Processed {ran} job(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
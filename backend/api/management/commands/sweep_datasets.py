@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.retention import expired_ids, resume_interrupted, sweep
+
+
+class Command(BaseCommand):
+    help = "Delete datasets the retention policy no longer keeps (see DATASET_RETENTION_* settings)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None,
+                            help="Newest datasets kept per user (default: DATASET_RETENTION_KEEP, 0 keeps all).")
+        parser.add_argument('--max-age-days', type=int, default=None,
+                            help="Also sweep datasets older than this (default: DATASET_RETENTION_MAX_AGE_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Datasets deleted per round (default: DATASET_RETENTION_BATCH_SIZE).")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be swept.")
+
+    def handle(self, *args, **options):
+        keep, max_age_days = options['keep'], options['max_age_days']
+        if options['dry_run']:
+            count = len(expired_ids(keep, max_age_days))
+            self.stdout.write(f"{count} dataset(s) would be swept")
+            return
+
+        resumed = resume_interrupted()
+        if resumed:
+            self.stdout.write(f"Finished deleting {resumed} dataset(s) left by an interrupted sweep")
+        swept = sweep(keep, max_age_days, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Swept {swept} dataset(s)"))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_ingest_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetSummary',
+            fields=[
+                ('dataset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.dataset')),
+                ('total_count', models.IntegerField()),
+                ('metrics', models.JSONField(default=dict)),
+                ('type_distribution', models.JSONField(default=dict)),
+                ('type_means', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_job_kind_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
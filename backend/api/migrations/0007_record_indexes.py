@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_job_params'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='api.dataset'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'id'], name='record_dataset_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+LABEL_FIELDS = (('equipment_type', 'EquipmentType'), ('equipment_name', 'EquipmentName'))
+
+
+def encode_labels(apps, schema_editor):
+    Record = apps.get_model('api', 'EquipmentRecord')
+    for field, model_name in LABEL_FIELDS:
+        Label = apps.get_model('api', model_name)
+        names = Record.objects.order_by().values_list(field, flat=True).distinct()
+        Label.objects.bulk_create([Label(name=name) for name in names.iterator()], batch_size=500)
+        # One set-based UPDATE per field rather than one per label
+        Record.objects.update(**{
+            f'{field}_key': Subquery(Label.objects.filter(name=OuterRef(field)).values('id')[:1]),
+        })
+
+
+def decode_labels(apps, schema_editor):
+    Record = apps.get_model('api', 'EquipmentRecord')
+    for field, model_name in LABEL_FIELDS:
+        Label = apps.get_model('api', model_name)
+        Record.objects.update(**{
+            field: Subquery(Label.objects.filter(id=OuterRef(f'{field}_key')).values('name')[:1]),
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_record_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentName',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='EquipmentType',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='equipmentrecord',
+            name='equipment_name_key',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.equipmentname'),
+        ),
+        migrations.AddField(
+            model_name='equipmentrecord',
+            name='equipment_type_key',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.equipmenttype'),
+        ),
+        # Nullable while both representations exist, so the reverse can refill them
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_name',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(encode_labels, decode_labels),
+        migrations.RemoveIndex(
+            model_name='equipmentrecord',
+            name='record_dataset_type_idx',
+        ),
+        migrations.RemoveField(
+            model_name='equipmentrecord',
+            name='equipment_name',
+        ),
+        migrations.RemoveField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+        ),
+        migrations.RenameField(
+            model_name='equipmentrecord',
+            old_name='equipment_name_key',
+            new_name='equipment_name',
+        ),
+        migrations.RenameField(
+            model_name='equipmentrecord',
+            old_name='equipment_type_key',
+            new_name='equipment_type',
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_name',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.equipmentname'),
+        ),
+        migrations.AlterField(
+            model_name='equipmentrecord',
+            name='equipment_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.equipmenttype'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentrecord',
+            index=models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_equipment_labels'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed'), ('deleting', 'Deleting')], default='ready', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('ingest', 'Ingest'), ('report', 'Report'), ('retention', 'Retention')], max_length=20),
+        ),
+    ]
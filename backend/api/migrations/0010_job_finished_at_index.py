@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_dataset_deleting_job_retention'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,30 +1,180 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 import os
 
+from django.conf import settings
 from django.contrib.auth.models import User
 
+from .columnar import remove_sidecar
+from .report_cache import remove_cached_reports
+
+class DatasetQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the datasets, their records in batches and, once committed,
+        their files. Instance deletes and the User cascade come through here.
+        """
+        # The rows are gone by the time the files go; those only need the id and name
+        datasets = [Dataset(pk=pk, file=name) for pk, name in self.values_list('pk', 'file')]
+        for dataset in datasets:
+            EquipmentRecord.delete_for_dataset(dataset.pk, using=self.db)
+        result = super().delete()
+
+        def remove_files():
+            for dataset in datasets:
+                dataset.delete_files()
+
+        transaction.on_commit(remove_files, using=self.db)
+        return result
+
 class Dataset(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+        # Claimed by a retention sweep (see api/retention.py)
+        DELETING = 'deleting', 'Deleting'
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, default=1)
     file = models.FileField(upload_to='datasets/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Keep only last 5
-        # Keep only last 5 FOR THIS USER
-        # Note: 'self.user' might be not set if not handled in view correctly yet, but default=1 helps.
-        if self.user:
-            ids_to_keep = list(Dataset.objects.filter(user=self.user).order_by('-uploaded_at')[:5].values_list('id', flat=True))
-            if Dataset.objects.filter(user=self.user).count() > 5:
-                 to_delete = Dataset.objects.filter(user=self.user).exclude(id__in=ids_to_keep)
-                 for ds in to_delete:
-                     ds.file.delete()
-                     ds.delete()
+    # Uploads stay PENDING until their ingest job finishes
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.READY)
+
+    objects = DatasetQuerySet.as_manager()
+
+    def delete_files(self):
+        """Remove the upload and everything derived from it on disk."""
+        remove_sidecar(self)
+        remove_cached_reports(self)
+        self.file.delete(save=False)
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the dataset as DatasetQuerySet.delete does."""
+        result = Dataset.objects.using(using).filter(pk=self.pk).delete()
+        self.pk = None
+        return result
+
+class EquipmentLabel(models.Model):
+    """A distinct string stored once and referenced by its integer key."""
+
+    # Keeps each IN (...) list well under SQLite's bound-parameter limit
+    LOOKUP_BATCH_SIZE = 500
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def ids_for(cls, names):
+        """``{name: id}`` for every name in ``names``, inserting the ones not stored yet."""
+        names = list(set(names))
+        ids = {}
+        for start in range(0, len(names), cls.LOOKUP_BATCH_SIZE):
+            batch = names[start:start + cls.LOOKUP_BATCH_SIZE]
+            ids.update(cls.objects.filter(name__in=batch).values_list('name', 'id'))
+            missing = [name for name in batch if name not in ids]
+            if missing:
+                # A concurrent ingest may insert the same names; keep theirs
+                cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+                ids.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+class EquipmentType(EquipmentLabel):
+    name = models.CharField(max_length=100, unique=True) # 'Type' in CSV
+
+class EquipmentName(EquipmentLabel):
+    name = models.CharField(max_length=255, unique=True)
 
 class EquipmentRecord(models.Model):
-    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records')
-    equipment_name = models.CharField(max_length=255)
-    equipment_type = models.CharField(max_length=100) # 'Type' in CSV
+    # Indexed through the composite indexes below, which lead with dataset
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='records', db_index=False)
+    # Dictionary-encoded: records hold integer keys into the label tables.
+    # Labels are never deleted, so the keys need no index of their own.
+    equipment_name = models.ForeignKey(EquipmentName, on_delete=models.PROTECT, related_name='+', db_index=False)
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name='+', db_index=False)
     flowrate = models.FloatField()
     pressure = models.FloatField()
     temperature = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # A dataset's records in id order: listing, keyset pages, streams, cascades
+            models.Index(fields=['dataset', 'id'], name='record_dataset_id_idx'),
+            # Per-type group-bys within a dataset
+            models.Index(fields=['dataset', 'equipment_type'], name='record_dataset_type_idx'),
+        ]
+
+    @classmethod
+    def delete_for_dataset(cls, dataset_id, batch_size=None, using=None):
+        """
+        Delete a dataset's records with one set-based DELETE per id range,
+        without loading them. Returns how many were deleted.
+        """
+        batch_size = batch_size or settings.RECORD_DELETE_BATCH_SIZE
+        records = cls.objects.using(using).filter(dataset_id=dataset_id)
+        deleted = 0
+        while True:
+            # Last id of the next batch, seeked on (dataset, id)
+            bound = list(records.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size])
+            batch = records.filter(id__lte=bound[0]) if bound else records
+            # Nothing cascades from records, so Django deletes them without loading them
+            deleted += batch.delete()[0]
+            if not bound:
+                return deleted
+
+class DatasetSummary(models.Model):
+    """Aggregates computed once at ingest; datasets never change afterwards."""
+    dataset = models.OneToOneField(Dataset, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    total_count = models.IntegerField()
+    # {metric: {"mean", "min", "max", "std", "p50", "p95", "p99"}} for flowrate, pressure, temperature
+    metrics = models.JSONField(default=dict)
+    # {equipment_type: count}
+    type_distribution = models.JSONField(default=dict)
+    # {equipment_type: {metric: mean}}
+    type_means = models.JSONField(default=dict)
+    # {equipment_type: {metric: {"mean", "min", "max", "std", "p50", "p95", "p99"}}}
+    type_metrics = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def metric_mean(self, metric):
+        return (self.metrics.get(metric) or {}).get('mean')
+
+class Job(models.Model):
+    """A unit of background work, claimed from this table by api.jobs workers."""
+
+    class Kind(models.TextChoices):
+        INGEST = 'ingest', 'Ingest'
+        REPORT = 'report', 'Report'
+        RETENTION = 'retention', 'Retention'
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    rows_total = models.IntegerField(null=True, blank=True)
+    # Handler options, e.g. {'charts': 'vector'} for reports
+    params = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Moved on by the worker while it runs; see api.jobs.reap_stale
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # Indexed for the Last-Modified of dataset lists (see api.conditional)
+    finished_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_datasets(sender, instance, using, **kwargs):
+    # The cascade would skip DatasetQuerySet.delete, leaving the files on disk
+    Dataset.objects.using(using).filter(user=instance).delete()
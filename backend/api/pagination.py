@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class RecordCursorPagination(CursorPagination):
+    """Keyset pagination over a dataset's records.
+
+    Pages are fetched with ``WHERE dataset_id = ? AND id > <cursor>`` rather
+    than an OFFSET, so every page costs the same however deep it is.
+    """
+    ordering = 'id'
+    page_size = 1000
+    page_size_query_param = 'page_size'
+    max_page_size = 10000
@@ -0,0 +1,20 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class ColumnarRenderer(BaseRenderer):
+    """NumPy ``.npz`` archive holding one array per record field.
+
+    Selected with ``Accept: application/vnd.chemviz.columns+npz`` or
+    ``?format=npz``; the view hands over the archive already encoded (see
+    api.columnar.npz_payload).
+    """
+    media_type = 'application/vnd.chemviz.columns+npz'
+    format = 'npz'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, bytearray)):
+            return data
+        # Error bodies (404, auth, ...) are dicts and have no columnar form
+        raise ValueError("ColumnarRenderer can only render pre-encoded payloads")
@@ -0,0 +1,82 @@
+"""
+On-disk cache of rendered PDF reports.
+
+Reports are immutable once rendered because datasets never change after
+upload, so each one is stored under a content address derived from the
+dataset and REPORT_TEMPLATE_VERSION. Bump the version whenever the report
+layout changes so stale files stop being served; they are evicted by the
+size budget.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+REPORT_TEMPLATE_VERSION = 2
+
+
+def report_key(dataset, charts):
+    # The chart mode and row cap change the rendered document, so both are part of the key
+    raw = (f"{dataset.id}:{dataset.uploaded_at.isoformat()}:v{REPORT_TEMPLATE_VERSION}"
+           f":{charts}:rows{settings.REPORT_MAX_ROWS}")
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def report_etag(dataset, charts):
+    return f'"{report_key(dataset, charts)}"'
+
+
+def cached_report_path(dataset, charts):
+    # The dataset id prefix lets every cached variant be found for eviction
+    return Path(settings.REPORT_CACHE_DIR) / f"{dataset.id}-{report_key(dataset, charts)}.pdf"
+
+
+@contextmanager
+def spool_report(path):
+    """Yield a temporary file next to ``path`` to render into.
+
+    The file replaces ``path`` once the block succeeds and is removed if it
+    raises, so readers never see a partial report. This does not bound the
+    memory of a render: reportlab's canvas keeps every page until save() and
+    then builds the whole document with GetPDFData before writing it. Only
+    REPORT_MAX_ROWS limits how large that gets.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix='.tmp',
+                                     delete=False) as tmp:
+        pass
+    try:
+        yield tmp.name
+        os.replace(tmp.name, path)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def remove_cached_reports(dataset):
+    for path in Path(settings.REPORT_CACHE_DIR).glob(f"{dataset.id}-*.pdf"):
+        path.unlink(missing_ok=True)
+
+
+def prune_report_cache(budget=None, keep=None):
+    """Delete least recently used reports until the cache fits in ``budget`` bytes."""
+    budget = settings.REPORT_CACHE_MAX_BYTES if budget is None else budget
+    entries = []
+    for path in Path(settings.REPORT_CACHE_DIR).glob('*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= budget:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
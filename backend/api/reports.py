@@ -0,0 +1,399 @@
+"""
+PDF analytical report for a dataset.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from django.conf import settings
+from reportlab.graphics import renderPDF
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from . import charts, vector_charts
+from .columnar import iter_rows
+from .downsample import trend_series
+from .report_cache import cached_report_path, prune_report_cache, spool_report
+from .stats import get_summary, type_aggregates
+
+# Points per series on the report's trend chart (about one per pixel column)
+REPORT_TREND_POINTS = 1000
+
+# 'raster': matplotlib PNGs (api.charts); 'vector': reportlab drawings (api.vector_charts)
+CHART_MODES = ('raster', 'vector')
+
+logger = logging.getLogger(__name__)
+
+_chart_pool = None
+_chart_pool_lock = threading.Lock()
+
+
+def chart_pool():
+    """Process pool shared by every report render, or None when REPORT_PROCESSES is 0.
+
+    Workers are spawned rather than forked: the web process is multithreaded,
+    and api.charts needs nothing from Django.
+    """
+    global _chart_pool
+    if not settings.REPORT_PROCESSES:
+        return None
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            _chart_pool = ProcessPoolExecutor(
+                max_workers=settings.REPORT_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _chart_pool
+
+
+def _discard_pool(pool):
+    # A worker died (e.g. OOM-killed); start a fresh pool next time
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is pool:
+            _chart_pool = None
+
+
+def _submit(fn, args):
+    """``(pool, future)`` for ``fn(*args)``, run inline (pool None) when there is no usable pool."""
+    pool = chart_pool()
+    if pool is not None:
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool:
+            logger.warning("Report chart pool is broken; rendering inline")
+            _discard_pool(pool)
+    future = Future()
+    future.set_result(fn(*args))
+    return None, future
+
+
+class ChartJob:
+    """A chart from api.charts rendering in the pool; ``result()`` gives its PNG bytes.
+
+    A worker dying mid-render breaks the whole pool and every future still
+    pending in it. The pool is then replaced and the chart submitted once more;
+    if that pool breaks as well, the chart is rendered inline.
+    """
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+        self.pool, self.future = _submit(fn, args)
+
+    def result(self):
+        try:
+            return self.future.result()
+        except BrokenProcessPool:
+            logger.warning("Report chart pool broke during a render; retrying in a fresh pool")
+            _discard_pool(self.pool)
+        pool, future = _submit(self.fn, self.args)
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            logger.warning("Report chart pool broke again; rendering inline")
+            _discard_pool(pool)
+        return self.fn(*self.args)
+
+
+def submit_chart(fn, *args):
+    """Run a chart function from api.charts in the pool; returns its ChartJob."""
+    return ChartJob(fn, *args)
+
+
+def render_report(dataset, out, charts_mode='raster'):
+    """Draw the report for ``dataset`` into ``out`` (a path or binary file object)."""
+    p = canvas.Canvas(out)
+    width, height = 595.27, 841.89 # A4 Size
+
+    # --- COLORS & FONTS ---
+    TEAL_MAIN = (0.05, 0.58, 0.53) # #0d9488
+    TEAL_DARK = (0.0, 0.3, 0.28) 
+    TEAL_LIGHT = (0.94, 0.99, 0.98) # #f0fdfa
+    GRAY_TEXT = (0.2, 0.2, 0.2)
+    GRAY_SUB = (0.5, 0.5, 0.5)
+    GRAY_LINE = (0.9, 0.9, 0.9)
+    
+    # --- HEADER ---
+    # Draw top banner
+    p.setFillColorRGB(*TEAL_MAIN)
+    p.rect(0, height - 80, width, 80, fill=1, stroke=0)
+    
+    # Logo placeholder (Text for now)
+    p.setFont("Helvetica-Bold", 28)
+    p.setFillColorRGB(1, 1, 1)
+    p.drawString(40, height - 50, "ChemViz")
+    
+    p.setFont("Helvetica", 12)
+    p.drawString(40, height - 68, "Advanced Chemical Process Analytics")
+
+    # Report Info (Right aligned)
+    p.setFont("Helvetica-Bold", 14)
+    p.drawRightString(width - 40, height - 45, "ANALYTICAL REPORT")
+    
+    p.setFont("Helvetica", 9)
+    p.drawRightString(width - 40, height - 62, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    p.drawRightString(width - 40, height - 74, f"Dataset ID: #{dataset.id}")
+
+    # --- FOOTER HELPER ---
+    def draw_footer(canvas, page_num):
+        canvas.saveState()
+        canvas.setStrokeColorRGB(*GRAY_LINE)
+        canvas.line(40, 40, width - 40, 40)
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColorRGB(*GRAY_SUB)
+        canvas.drawString(40, 25, "ChemViz Analytics Platform • Confidential Report")
+        canvas.drawRightString(width - 40, 25, f"Page {page_num}")
+        canvas.restoreState()
+
+    # --- CONTENT ---
+    summary = get_summary(dataset.id)
+    total = summary.total_count if summary else 0
+    
+    if total > 0:
+        avg_flow = summary.metric_mean('flowrate')
+        avg_press = summary.metric_mean('pressure')
+        avg_temp = summary.metric_mean('temperature')
+        
+        y_pos = height - 120
+        
+        # Title Section
+        p.setFont("Helvetica-Bold", 16)
+        p.setFillColorRGB(*GRAY_TEXT)
+        p.drawString(40, y_pos, "Executive Summary")
+        y_pos -= 10
+        
+        # --- KPI CARDS ---
+        card_y = y_pos - 70
+        card_width = 120
+        card_height = 60
+        gap = 15
+        
+        def draw_stat_box(x, title, value, unit, icon_color=(0.9, 0.9, 0.9)):
+            # Shadow effect
+            p.setFillColorRGB(0.95, 0.95, 0.95)
+            p.roundRect(x+2, card_y-2, card_width, card_height, 6, fill=1, stroke=0)
+            # Main box
+            p.setFillColorRGB(1, 1, 1)
+            p.setStrokeColorRGB(0.9, 0.9, 0.9)
+            p.roundRect(x, card_y, card_width, card_height, 6, fill=1, stroke=1)
+            
+            # Title
+            p.setFont("Helvetica", 9)
+            p.setFillColorRGB(*GRAY_SUB)
+            p.drawString(x + 12, card_y + 42, title)
+            
+            # Value
+            p.setFont("Helvetica-Bold", 18)
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.drawString(x + 12, card_y + 18, str(value))
+            
+            # Unit
+            if unit:
+                p.setFont("Helvetica-Bold", 9)
+                p.setFillColorRGB(*GRAY_SUB)
+                p.drawRightString(x + card_width - 12, card_y + 20, unit)
+
+        draw_stat_box(40, "Total Records", str(total), "")
+        draw_stat_box(40 + card_width + gap, "Avg Flowrate", f"{avg_flow:.1f}", "L/min")
+        draw_stat_box(40 + 2*(card_width + gap), "Avg Pressure", f"{avg_press:.1f}", "PSI")
+        draw_stat_box(40 + 3*(card_width + gap), "Avg Temp", f"{avg_temp:.1f}", "°C")
+
+        # --- GRAPHS ---
+        y_pos = card_y - 30
+        
+        # Both chart images render in the process pool at the same time;
+        # downsampled series keep the trend's shape without plotting every row
+        flow = trend_series(dataset, 'flowrate', REPORT_TREND_POINTS)
+        press = trend_series(dataset, 'pressure', REPORT_TREND_POINTS)
+        flow_by_type = {t: means['flowrate'] for t, means in summary.type_means.items()}
+        graph_height = 180
+        graph_height_2 = 160
+
+        if charts_mode == 'vector':
+            # 1. Trend Chart
+            renderPDF.draw(vector_charts.trend_drawing(flow, press, 520, graph_height),
+                           p, 35, y_pos - graph_height)
+            y_pos -= (graph_height + 30)
+
+            # 2. Side-by-Side: Distribution + Bar
+            renderPDF.draw(vector_charts.distribution_drawing(summary.type_distribution, flow_by_type,
+                                                              520, graph_height_2),
+                           p, 35, y_pos - graph_height_2)
+        else:
+            trend_png = submit_chart(charts.trend_chart, flow, press)
+            distribution_png = submit_chart(charts.distribution_charts, summary.type_distribution, flow_by_type)
+
+            # 1. Trend Chart
+            p.drawImage(ImageReader(io.BytesIO(trend_png.result())), 35, y_pos - graph_height, width=520, height=graph_height)
+            y_pos -= (graph_height + 30)
+
+            # 2. Side-by-Side: Distribution + Bar
+            p.drawImage(ImageReader(io.BytesIO(distribution_png.result())), 35, y_pos - graph_height_2, width=520, height=graph_height_2)
+
+        draw_footer(p, 1)
+        p.showPage()
+        
+        # --- PAGE 2: TABLE ---
+        # Header on new page
+        p.setFillColorRGB(*TEAL_MAIN)
+        p.rect(0, height - 60, width, 60, fill=1, stroke=0)
+        p.setFont("Helvetica-Bold", 18)
+        p.setFillColorRGB(1, 1, 1)
+        p.drawString(40, height - 40, "Detailed Equipment Logs")
+        
+        y = height - 100
+        
+        # Table Schema
+        cols = [
+            {"name": "Equipment Name", "x": 40, "w": 180},
+            {"name": "Type", "x": 220, "w": 100},
+            {"name": "Flow (L/min)", "x": 320, "w": 80},
+            {"name": "Press (PSI)", "x": 400, "w": 80},
+            {"name": "Temp (°C)", "x": 480, "w": 80},
+        ]
+        
+        # Draw Header Row
+        p.setFillColorRGB(*TEAL_MAIN)
+        p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
+        p.setFillColorRGB(1, 1, 1)
+        p.setFont("Helvetica-Bold", 9)
+        
+        for col in cols:
+            p.drawString(col["x"] + 10, y + 2, col["name"])
+        
+        y -= 25
+        page_num = 2
+        
+        p.setFont("Helvetica", 9)
+        p.setFillColorRGB(*GRAY_TEXT)
+        
+        # Rows stream in chunks from the sidecar (or a DB cursor) up to the cap
+        row_cap = settings.REPORT_MAX_ROWS or None
+        rows = iter_rows(dataset, limit=row_cap, chunk_size=settings.RECORDS_STREAM_CHUNK_SIZE)
+        for index, (name, eq_type, flowrate, pressure, temperature) in enumerate(rows):
+            if y < 60:
+                draw_footer(p, page_num)
+                p.showPage()
+                page_num += 1
+                
+                # Re-draw header on new page
+                p.setFillColorRGB(*TEAL_MAIN)
+                p.rect(0, height - 40, width, 40, fill=1, stroke=0)
+                p.setFont("Helvetica-Bold", 14)
+                p.setFillColorRGB(1, 1, 1)
+                p.drawString(40, height - 28, "Detailed Equipment Logs (Cont.)")
+                
+                y = height - 80
+                p.setFillColorRGB(*TEAL_MAIN)
+                p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
+                p.setFillColorRGB(1, 1, 1)
+                p.setFont("Helvetica-Bold", 9)
+                for col in cols:
+                    p.drawString(col["x"] + 10, y + 2, col["name"])
+                y -= 25
+                p.setFont("Helvetica", 9)
+
+            # Row Background
+            if index % 2 == 0:
+                p.setFillColorRGB(*TEAL_LIGHT)
+                p.rect(40, y - 6, 515, 18, fill=1, stroke=0)
+            
+            # Cell Content
+            p.setFillColorRGB(*GRAY_TEXT)
+            p.drawString(cols[0]["x"] + 10, y, str(name)[:28])
+            p.drawString(cols[1]["x"] + 10, y, str(eq_type))
+            p.drawString(cols[2]["x"] + 10, y, f"{flowrate:.1f}")
+            p.drawString(cols[3]["x"] + 10, y, f"{pressure:.1f}")
+            
+            # Conditional color for Temp
+            if temperature > 100:
+                p.setFillColorRGB(0.8, 0.2, 0.2)
+                p.setFont("Helvetica-Bold", 9)
+            p.drawString(cols[4]["x"] + 10, y, f"{temperature:.1f}")
+            
+            if temperature > 100:
+                p.setFillColorRGB(*GRAY_TEXT)
+                p.setFont("Helvetica", 9)
+
+            y -= 20
+            
+        draw_footer(p, page_num)
+
+        # --- APPENDIX: ROWS PAST THE CAP ---
+        if row_cap and total > row_cap:
+            p.showPage()
+            page_num += 1
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.rect(0, height - 60, width, 60, fill=1, stroke=0)
+            p.setFont("Helvetica-Bold", 18)
+            p.setFillColorRGB(1, 1, 1)
+            p.drawString(40, height - 40, "Remaining Records by Type")
+
+            p.setFont("Helvetica", 9)
+            p.setFillColorRGB(*GRAY_SUB)
+            p.drawString(40, height - 85, f"The table lists the first {row_cap:,} of {total:,} records; "
+                                          f"the remaining {total - row_cap:,} are summarized below.")
+
+            y = height - 120
+            appendix_cols = [
+                {"name": "Type", "x": 40},
+                {"name": "Records", "x": 160},
+                {"name": "Avg Flow", "x": 240},
+                {"name": "Avg Press", "x": 320},
+                {"name": "Avg Temp", "x": 400},
+                {"name": "Max Temp", "x": 480},
+            ]
+            p.setFillColorRGB(*TEAL_MAIN)
+            p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
+            p.setFillColorRGB(1, 1, 1)
+            p.setFont("Helvetica-Bold", 9)
+            for col in appendix_cols:
+                p.drawString(col["x"] + 10, y + 2, col["name"])
+            y -= 25
+
+            p.setFont("Helvetica", 9)
+            for index, (eq_type, agg) in enumerate(type_aggregates(dataset, start=row_cap).items()):
+                if y < 60:
+                    draw_footer(p, page_num)
+                    p.showPage()
+                    page_num += 1
+                    y = height - 80
+                    p.setFont("Helvetica", 9)
+                if index % 2 == 0:
+                    p.setFillColorRGB(*TEAL_LIGHT)
+                    p.rect(40, y - 6, 515, 18, fill=1, stroke=0)
+                p.setFillColorRGB(*GRAY_TEXT)
+                values = [str(eq_type)[:20], f"{agg['count']:,}", f"{agg['flowrate']:.1f}",
+                          f"{agg['pressure']:.1f}", f"{agg['temperature']:.1f}",
+                          f"{agg['max_temperature']:.1f}"]
+                for col, value in zip(appendix_cols, values):
+                    p.drawString(col["x"] + 10, y, value)
+                y -= 20
+
+            draw_footer(p, page_num)
+
+    else:
+        p.setFont("Helvetica", 12)
+        p.drawString(40, height - 150, "No data records found in this dataset.")
+
+    p.showPage()
+    p.save()
+
+
+def get_report(dataset, charts_mode=None):
+    """Path of the cached report for ``dataset``, rendering it on a cache miss."""
+    charts_mode = charts_mode or settings.REPORT_CHART_MODE
+    path = cached_report_path(dataset, charts_mode)
+    if path.exists():
+        # Hits refresh the mtime so the size budget evicts least recently used first
+        path.touch()
+        return path
+    with spool_report(path) as tmp_path:
+        render_report(dataset, tmp_path, charts_mode)
+    prune_report_cache(keep=path)
+    return path
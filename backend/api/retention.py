@@ -0,0 +1,95 @@
+"""
+Dataset retention, swept in batches off the request path.
+
+Each user keeps their newest ``DATASET_RETENTION_KEEP`` READY datasets,
+and optionally none older than ``DATASET_RETENTION_MAX_AGE_DAYS``. Failed
+uploads hold no records and are never listed, so they do not count towards
+the limit; they are swept on their own once ``DATASET_RETENTION_FAILED_HOURS``
+old, which leaves clients time to read the ingest error. Expired
+datasets are found for every user in one windowed query, then claimed one by
+one with a conditional UPDATE to DELETING (the same pattern api.jobs uses for
+the job queue), so two sweeps racing over the same user, e.g. after two
+uploads finish together, never delete the same dataset twice or count the
+other's claims against the limit. Claimed datasets are already hidden from
+every view, which only serve READY ones.
+
+Datasets still PENDING are never counted nor swept: an upload whose ingest is
+running cannot be removed from under it.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Dataset
+
+logger = logging.getLogger(__name__)
+
+# Datasets that may be swept; only READY ones count towards a user's limit
+SWEEPABLE = (Dataset.Status.READY, Dataset.Status.FAILED)
+
+
+def expired_ids(keep=None, max_age_days=None, user=None, limit=None):
+    """Ids of datasets the policy no longer keeps, oldest first."""
+    keep = settings.DATASET_RETENTION_KEEP if keep is None else keep
+    if max_age_days is None:
+        max_age_days = settings.DATASET_RETENTION_MAX_AGE_DAYS
+    datasets = Dataset.objects.filter(status__in=SWEEPABLE)
+    if user is not None:
+        datasets = datasets.filter(user=user)
+
+    expired = set()
+    if keep:
+        ranked = datasets.filter(status=Dataset.Status.READY).annotate(newer=Window(
+            RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=[F('uploaded_at').desc(), F('id').desc()],
+        ))
+        expired.update(ranked.filter(newer__gt=keep).values_list('id', flat=True))
+    if max_age_days:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        expired.update(datasets.filter(uploaded_at__lt=cutoff).values_list('id', flat=True))
+    failed_cutoff = timezone.now() - timedelta(hours=settings.DATASET_RETENTION_FAILED_HOURS)
+    expired.update(datasets.filter(status=Dataset.Status.FAILED, uploaded_at__lt=failed_cutoff)
+                   .values_list('id', flat=True))
+    return sorted(expired)[:limit]
+
+
+def claim(dataset_ids):
+    """Mark ``dataset_ids`` DELETING, returning only those this caller won."""
+    claimed = []
+    for dataset_id in dataset_ids:
+        if Dataset.objects.filter(id=dataset_id, status__in=SWEEPABLE).update(status=Dataset.Status.DELETING):
+            claimed.append(dataset_id)
+    return claimed
+
+
+def delete_datasets(dataset_ids):
+    # DatasetQuerySet.delete removes records in batches and the files once committed
+    Dataset.objects.filter(id__in=dataset_ids, status=Dataset.Status.DELETING).delete()
+
+
+def sweep(keep=None, max_age_days=None, user=None, batch_size=None):
+    """Delete every dataset the retention policy no longer keeps. Returns how many went."""
+    batch_size = batch_size or settings.DATASET_RETENTION_BATCH_SIZE
+    swept = 0
+    while True:
+        batch = expired_ids(keep, max_age_days, user, limit=batch_size)
+        if not batch:
+            break
+        claimed = claim(batch)
+        delete_datasets(claimed)
+        swept += len(claimed)
+    if swept:
+        logger.info("Retention swept %d dataset(s)", swept)
+    return swept
+
+
+def resume_interrupted():
+    """Finish deleting datasets a crashed sweep left claimed. Returns how many."""
+    dataset_ids = list(Dataset.objects.filter(status=Dataset.Status.DELETING).values_list('id', flat=True))
+    delete_datasets(dataset_ids)
+    return len(dataset_ids)
@@ -1,12 +1,32 @@
 from rest_framework import serializers
-from .models import Dataset, EquipmentRecord
+from .models import Dataset, EquipmentRecord, Job
 
 class EquipmentRecordSerializer(serializers.ModelSerializer):
+    # Names and types are stored as keys into lookup tables; clients get the strings
+    equipment_name = serializers.CharField(source='equipment_name.name', read_only=True)
+    equipment_type = serializers.CharField(source='equipment_type.name', read_only=True)
+
     class Meta:
         model = EquipmentRecord
-        fields = '__all__'
+        fields = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'dataset']
 
 class DatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dataset
         fields = ['id', 'file', 'uploaded_at']
+
+class JobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='id')
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['job_id', 'kind', 'status', 'dataset', 'rows_processed', 'rows_total',
+                  'progress', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_progress(self, job):
+        if job.status == Job.Status.DONE:
+            return 1.0
+        if not job.rows_total:
+            return 0.0
+        return min(job.rows_processed / job.rows_total, 1.0)
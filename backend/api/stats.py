@@ -0,0 +1,212 @@
+"""
+Vectorized dataset statistics.
+
+Everything here works on whole NumPy columns (from the memory-mapped
+sidecar when there is one, see api.columnar) with equipment types held as
+integer codes, so per-type aggregates are ``np.bincount`` calls instead of
+Python loops or extra SQL round trips.
+"""
+import numpy as np
+import pandas as pd
+from django.db.models import Avg, Count, Max
+
+from .columnar import METRICS, load_columns
+from .models import Dataset, DatasetSummary, EquipmentType
+
+
+def dataset_arrays(dataset):
+    """Return ``({metric: ndarray}, type_codes, type_labels)`` for ``dataset``."""
+    columns = load_columns(dataset)
+    if columns is not None:
+        return ({m: columns.metric(m) for m in METRICS},
+                columns.type_codes, columns.type_labels)
+
+    # equipment_type is the integer key; names are looked up per distinct key
+    rows = list(dataset.records.order_by('id').values_list('equipment_type', *METRICS))
+    if not rows:
+        return {m: np.empty(0) for m in METRICS}, np.empty(0, dtype=np.int32), []
+    type_ids, *values = zip(*rows)
+    codes, uniques = pd.factorize(np.asarray(type_ids))
+    return ({m: np.asarray(v, dtype=float) for m, v in zip(METRICS, values)},
+            codes.astype(np.int32), type_names(uniques.tolist()))
+
+
+def type_names(type_ids):
+    """Names of the EquipmentType keys in ``type_ids``, in the same order."""
+    names = dict(EquipmentType.objects.filter(id__in=type_ids).values_list('id', 'name'))
+    return [names[type_id] for type_id in type_ids]
+
+
+def type_aggregates(dataset, start=0):
+    """Per-type record count, metric means and max temperature over the
+    rows from position ``start`` (in id order) on, sorted by type.
+
+    Uses the sidecar slices when there is one and a single grouped query
+    otherwise, so the rows themselves are never loaded.
+    """
+    columns = load_columns(dataset)
+    if columns is not None:
+        codes = np.asarray(columns.type_codes[start:])
+        counts = np.bincount(codes, minlength=len(columns.type_labels))
+        present = np.flatnonzero(counts)
+        stats = {m: np.bincount(codes, weights=np.asarray(columns.metric(m)[start:]),
+                                minlength=len(counts))[present] / counts[present]
+                 for m in METRICS}
+        max_temperature = np.full(len(counts), -np.inf)
+        np.maximum.at(max_temperature, codes, np.asarray(columns.temperature[start:]))
+        result = {
+            columns.type_labels[code]: {
+                'count': int(counts[code]),
+                **{m: float(stats[m][i]) for m in METRICS},
+                'max_temperature': float(max_temperature[code]),
+            }
+            for i, code in enumerate(present)
+        }
+        return dict(sorted(result.items()))
+
+    records = dataset.records.all()
+    if start:
+        boundary = list(dataset.records.order_by('id').values_list('id', flat=True)[start:start + 1])
+        if not boundary:
+            return {}
+        records = records.filter(id__gte=boundary[0])
+    rows = list(records.values('equipment_type')
+                .annotate(count=Count('id'), max_temperature=Max('temperature'),
+                          **{f'{m}_mean': Avg(m) for m in METRICS})
+                .order_by())
+    names = type_names([row['equipment_type'] for row in rows])
+    result = {
+        name: {
+            'count': row['count'],
+            **{m: row[f'{m}_mean'] for m in METRICS},
+            'max_temperature': row['max_temperature'],
+        }
+        for name, row in zip(names, rows)
+    }
+    return dict(sorted(result.items()))
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def describe_groups(sorted_values, starts, counts):
+    """Stats for consecutive groups of a sorted array, all groups at once.
+
+    ``sorted_values[starts[i]:starts[i] + counts[i]]`` must be the ascending
+    values of group ``i`` and every group must be non-empty. Percentiles use
+    linear interpolation, matching ``np.percentile``'s default.
+    """
+    means = np.add.reduceat(sorted_values, starts) / counts
+    deviations = sorted_values - np.repeat(means, counts)
+    stats = {
+        'mean': means,
+        'min': sorted_values[starts],
+        'max': sorted_values[starts + counts - 1],
+        'std': np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts),
+    }
+    for q in PERCENTILES:
+        position = q / 100 * (counts - 1)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        low, high = sorted_values[starts + below], sorted_values[starts + above]
+        stats[f'p{q}'] = low + (high - low) * (position - below)
+    return stats
+
+
+def _group_stats(stats, i):
+    return {key: float(values[i]) for key, values in stats.items()}
+
+
+def summarize(metrics, type_codes, type_labels):
+    """Overall and per-type stats of every metric in one vectorized pass.
+
+    Each metric is sorted once overall and once by (type, value); count,
+    mean, min, max, stddev and percentiles for every group are then read
+    off the sorted arrays with no per-row or per-group Python work.
+    """
+    total = len(type_codes)
+    summary = {
+        'total_count': total,
+        'metrics': {},
+        'type_distribution': {},
+        'type_means': {},
+        'type_metrics': {},
+    }
+    if not total:
+        return summary
+
+    codes = np.asarray(type_codes)
+    counts = np.bincount(codes, minlength=len(type_labels))
+    present = np.flatnonzero(counts)
+    group_counts = counts[present]
+    group_starts = np.concatenate(([0], np.cumsum(group_counts)[:-1]))
+    labels = [type_labels[code] for code in present]
+
+    type_metrics = {label: {} for label in labels}
+    for name, values in metrics.items():
+        values = np.asarray(values, dtype=float)
+        overall = describe_groups(np.sort(values), np.array([0]), np.array([total]))
+        summary['metrics'][name] = _group_stats(overall, 0)
+
+        by_type = describe_groups(values[np.lexsort((values, codes))], group_starts, group_counts)
+        for i, label in enumerate(labels):
+            type_metrics[label][name] = _group_stats(by_type, i)
+
+    order = sorted(range(len(labels)), key=lambda i: labels[i])
+    summary['type_distribution'] = {labels[i]: int(group_counts[i]) for i in order}
+    summary['type_metrics'] = {labels[i]: type_metrics[labels[i]] for i in order}
+    summary['type_means'] = {
+        label: {name: stats['mean'] for name, stats in per_metric.items()}
+        for label, per_metric in summary['type_metrics'].items()
+    }
+    return summary
+
+
+def compute_summary(dataset):
+    return summarize(*dataset_arrays(dataset))
+
+
+def save_summary(dataset):
+    summary, _ = DatasetSummary.objects.update_or_create(
+        dataset=dataset, defaults=compute_summary(dataset)
+    )
+    return summary
+
+
+def get_summary(dataset_id, extended=False):
+    """Stored summary for ``dataset_id``, built on first use if it is missing.
+
+    With ``extended``, summaries stored before per-type stats existed are
+    recomputed as well.
+    """
+    summary = DatasetSummary.objects.filter(pk=dataset_id).first()
+    if summary is None or (extended and summary.total_count and not summary.type_metrics):
+        dataset = Dataset.objects.filter(id=dataset_id, status=Dataset.Status.READY).first()
+        if dataset is not None:
+            summary = save_summary(dataset)
+    return summary
+
+
+def stats_payload(summary):
+    # Response shape of DatasetStatsView; the first five keys predate the summary
+    return {
+        "total_count": summary.total_count,
+        "average_flowrate": summary.metric_mean('flowrate'),
+        "average_pressure": summary.metric_mean('pressure'),
+        "average_temperature": summary.metric_mean('temperature'),
+        "type_distribution": summary.type_distribution,
+        "metrics": summary.metrics,
+        "type_means": summary.type_means,
+    }
+
+
+def extended_stats_payload(summary):
+    return {
+        "total_count": summary.total_count,
+        "percentiles": [f"p{q}" for q in PERCENTILES],
+        "overall": summary.metrics,
+        "by_type": {
+            label: {"count": summary.type_distribution.get(label, 0), **per_metric}
+            for label, per_metric in summary.type_metrics.items()
+        },
+    }
@@ -0,0 +1,106 @@
+"""
+Incremental JSON / NDJSON encoding of dataset records.
+
+Rows are pulled with ``values_list(...).iterator()`` (a server-side cursor
+on PostgreSQL) and encoded in fixed-size batches, so a response of any
+size is produced with bounded memory.
+
+Rows are encoded by ``RecordEncoder``, which fills a string template per row
+instead of building a dict for json to walk, and produces exactly the bytes
+EquipmentRecordSerializer plus JSONRenderer would, at several times the speed
+(see benchmark_serialization.py). The unstreamed records list uses it too.
+
+Under ASGI, api.async_views sends these streams from an async iterator.
+"""
+from json.encoder import encode_basestring
+from math import isfinite
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+# Same keys, in the same order, as EquipmentRecordSerializer
+RECORD_FIELDS = ('id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'dataset')
+# The values_list lookups behind RECORD_FIELDS
+RECORD_COLUMNS = ('id', 'equipment_name__name', 'equipment_type__name',
+                  'flowrate', 'pressure', 'temperature', 'dataset')
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# JSONRenderer escapes these so its output is also valid JavaScript
+_JS_LINE_BREAKS = str.maketrans({'\u2028': '\\u2028', '\u2029': '\\u2029'})
+
+
+class RecordEncoder:
+    """
+    Encodes RECORD_COLUMNS rows as compact JSON objects. Names and types come
+    from small lookup tables, so each distinct label is escaped only once.
+    """
+
+    def __init__(self):
+        self.labels = {}
+
+    def label(self, value):
+        encoded = self.labels.get(value)
+        if encoded is None:
+            encoded = self.labels[value] = encode_basestring(value).translate(_JS_LINE_BREAKS)
+        return encoded
+
+    def __call__(self, row):
+        record_id, name, eq_type, flowrate, pressure, temperature, dataset_id = row
+        # The serializer's FloatField casts to float; json writes floats with repr
+        flowrate, pressure, temperature = float(flowrate), float(pressure), float(temperature)
+        if not (isfinite(flowrate) and isfinite(pressure) and isfinite(temperature)):
+            # As json.dumps(..., allow_nan=False) would
+            raise ValueError(f"Out of range float values are not JSON compliant: {row!r}")
+        label = self.label
+        return (f'{{"id":{record_id:d},"equipment_name":{label(name)},"equipment_type":{label(eq_type)},'
+                f'"flowrate":{flowrate!r},"pressure":{pressure!r},"temperature":{temperature!r},'
+                f'"dataset":{dataset_id:d}}}')
+
+
+def encode_records(queryset):
+    """The records of ``queryset`` as the JSON list JSONRenderer would render, in bytes."""
+    encode = RecordEncoder()
+    rows = queryset.order_by('id').values_list(*RECORD_COLUMNS)
+    return ('[' + ','.join(map(encode, rows)) + ']').encode()
+
+
+def iter_record_rows(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.RECORDS_STREAM_CHUNK_SIZE
+    return queryset.order_by('id').values_list(*RECORD_COLUMNS).iterator(chunk_size=chunk_size)
+
+
+def _batches(rows, size):
+    encode = RecordEncoder()
+    batch = []
+    for row in rows:
+        batch.append(encode(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_ndjson(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.RECORDS_STREAM_CHUNK_SIZE
+    for batch in _batches(iter_record_rows(queryset, chunk_size), chunk_size):
+        yield '\n'.join(batch) + '\n'
+
+
+def iter_json(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.RECORDS_STREAM_CHUNK_SIZE
+    yield '['
+    separator = ''
+    for batch in _batches(iter_record_rows(queryset, chunk_size), chunk_size):
+        yield separator + ','.join(batch)
+        separator = ','
+    yield ']'
+
+
+def stream_records(queryset, fmt):
+    iterator = iter_ndjson if fmt == 'ndjson' else iter_json
+    return StreamingHttpResponse(iterator(queryset), content_type=STREAM_FORMATS[fmt])
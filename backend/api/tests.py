@@ -1,3 +1,870 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .authentication import make_ticket
+from .columnar import dataset_sidecar_dir, remove_sidecar
+from .models import Dataset, EquipmentName, EquipmentRecord, EquipmentType, Job
+from .ingest import ingest_csv
+from . import reports
+from .downsample import lttb, minmax, trend_series
+from .histogram import bin_counts, bin_edges
+from .jobs import reap_stale, run_job
+from .payloads import write_payloads
+from .report_cache import report_key
+from .reports import render_report
+from .retention import claim, expired_ids, resume_interrupted, sweep
+from .serializers import EquipmentRecordSerializer
+from .stats import compute_summary, save_summary
+from .streaming import encode_records
+
+
+def explain(sql):
+    """The SQLite query plan of ``sql`` as one line per plan step."""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+CSV_HEADER = "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+
+
+def uploaded_dataset(user, rows, name='upload'):
+    """A PENDING dataset with a CSV of ``rows`` under MEDIA_ROOT, as an upload leaves it."""
+    dataset = Dataset.objects.create(user=user, file=f'datasets/{name}.csv', status=Dataset.Status.PENDING)
+    os.makedirs(os.path.dirname(dataset.file.path), exist_ok=True)
+    with open(dataset.file.path, 'w') as f:
+        f.write(CSV_HEADER + ''.join(f"{row}\n" for row in rows))
+    return dataset
+
+
+@override_settings(REPORT_PROCESSES=0, REPORT_MAX_ROWS=10, REPORT_CACHE_DIR=tempfile.mkdtemp())
+class RecordQueryPlanTests(TestCase):
+    """
+    Every query the API runs against api_equipmentrecord must be an index
+    search, never a scan of the whole table. The dataset has no columnar
+    sidecar, so the ORM fallbacks of every endpoint are exercised too.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('plans', 'plans@example.com', 'plans')
+        cls.dataset = Dataset.objects.create(user=cls.user, file='datasets/plans.csv')
+        other = Dataset.objects.create(user=cls.user, file='datasets/other.csv')
+        types = list(EquipmentType.ids_for(['Pump', 'Valve', 'Exchanger']).values())
+        names = EquipmentName.ids_for(f'Unit-{i}' for i in range(40))
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=dataset, equipment_name_id=names[f'Unit-{i}'],
+                            equipment_type_id=types[i % 3],
+                            flowrate=100 + i, pressure=5 + i % 7, temperature=60 + i % 50)
+            for dataset in (cls.dataset, other) for i in range(40)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def record_queries(self, *urls):
+        with CaptureQueriesContext(connection) as captured:
+            for url in urls:
+                response = self.client.get(url)
+                self.assertLess(response.status_code, 300, url)
+                # Streaming responses only run their queries while being consumed
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        return [q['sql'] for q in captured.captured_queries
+                if '"api_equipmentrecord"' in q['sql'] and q['sql'].startswith('SELECT')]
+
+    def assertIndexed(self, sql, index=None):
+        plan = explain(sql)
+        text = '\n'.join(plan)
+        self.assertNotRegex(text, r'\bSCAN (TABLE )?api_equipmentrecord\b', f'{sql}\n{text}')
+        self.assertRegex(text, r'SEARCH (TABLE )?api_equipmentrecord USING (COVERING )?INDEX', f'{sql}\n{text}')
+        if index:
+            self.assertIn(index, text, sql)
+
+    def test_endpoint_queries_use_indexes(self):
+        base = f'/api/datasets/{self.dataset.id}'
+        queries = self.record_queries(
+            f'{base}/data/',
+            f'{base}/data/?page_size=10',
+            f'{base}/data/?stream=ndjson',
+            f'{base}/data/?format=npz',
+            f'{base}/stats/',
+            f'{base}/stats/extended/',
+            f'{base}/trend/?points=10',
+            f'{base}/histogram/?by=type',
+            f'{base}/pdf/',
+        )
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertIndexed(sql)
+
+    def test_keyset_page_seeks_on_dataset_and_id(self):
+        page = self.client.get(f'/api/datasets/{self.dataset.id}/data/?page_size=10').json()
+        queries = self.record_queries(page['next'].split('testserver', 1)[1])
+        self.assertIndexed(queries[-1], 'record_dataset_id_idx')
+        self.assertRegex('\n'.join(explain(queries[-1])), r'id>\?|rowid>\?')
+
+    def test_type_group_by_uses_type_index(self):
+        queryset = (EquipmentRecord.objects.filter(dataset=self.dataset)
+                    .values('equipment_type').annotate(count=Count('id')).order_by('equipment_type'))
+        plan = explain(str(queryset.query))
+        self.assertIn('record_dataset_type_idx', '\n'.join(plan))
+        self.assertFalse(any(re.search(r'TEMP B-TREE', step) for step in plan), plan)
+
+
+@override_settings(REPORT_PROCESSES=0, REPORT_MAX_ROWS=10, REPORT_CACHE_DIR=tempfile.mkdtemp())
+class ConditionalRequestTests(TestCase):
+    """
+    Read endpoints answer a repeated GET carrying their validators with a
+    304, from a single small lookup and without touching the records table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('etags', 'etags@example.com', 'etags')
+        cls.dataset = Dataset.objects.create(user=cls.user, file='datasets/etags.csv')
+        types = EquipmentType.ids_for(['Pump', 'Valve'])
+        names = EquipmentName.ids_for(f'Unit-{i}' for i in range(20))
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=cls.dataset, equipment_name_id=names[f'Unit-{i}'],
+                            equipment_type_id=types['Pump' if i % 2 else 'Valve'],
+                            flowrate=100 + i, pressure=5 + i, temperature=60 + i)
+            for i in range(20)
+        )
+        save_summary(cls.dataset)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNotModified(self, url, queries, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200, url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as captured:
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(revalidated.status_code, 304, url)
+        self.assertEqual(revalidated['ETag'], etag)
+        self.assertEqual(revalidated.content, b'')
+        sql = [q['sql'] for q in captured.captured_queries]
+        self.assertEqual(len(sql), queries, '\n'.join(sql))
+        self.assertFalse([q for q in sql if 'api_equipmentrecord' in q], url)
+
+        by_date = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified, **headers)
+        self.assertEqual(by_date.status_code, 304, url)
+        return etag
+
+    def test_list_endpoints(self):
+        # The listed ids, then the latest finished job
+        self.assertNotModified('/api/datasets/', queries=2)
+        self.assertNotModified('/api/global-datasets/', queries=2)
+
+    def test_dataset_endpoints(self):
+        base = f'/api/datasets/{self.dataset.id}'
+        # The dataset row (data/, pdf/) or the summary timestamp (stats/)
+        self.assertNotModified(f'{base}/data/', queries=1)
+        self.assertNotModified(f'{base}/data/?stream=ndjson', queries=1)
+        self.assertNotModified(f'{base}/stats/', queries=1)
+        self.assertNotModified(f'{base}/stats/extended/', queries=1)
+        self.assertNotModified(f'{base}/pdf/?charts=vector', queries=1)
+
+    def test_report_waits_for_ingest(self):
+        Dataset.objects.filter(id=self.dataset.id).update(status=Dataset.Status.PENDING)
+        self.assertEqual(self.client.get(f'/api/datasets/{self.dataset.id}/pdf/').status_code, 404)
+
+    def test_records_wait_for_ingest(self):
+        base = f'/api/datasets/{self.dataset.id}/data/'
+        for dataset_status in (Dataset.Status.PENDING, Dataset.Status.FAILED):
+            Dataset.objects.filter(id=self.dataset.id).update(status=dataset_status)
+            for url in (base, f'{base}?stream=ndjson', f'{base}?page_size=5', f'{base}?format=npz'):
+                self.assertEqual(self.client.get(url).status_code, 404, f'{dataset_status} {url}')
+
+    def test_etag_differs_per_representation(self):
+        url = f'/api/datasets/{self.dataset.id}/data/'
+        as_json = self.assertNotModified(url, queries=1)
+        as_npz = self.assertNotModified(url, queries=1, HTTP_ACCEPT='application/vnd.chemviz.columns+npz')
+        paged = self.assertNotModified(f'{url}?page_size=5', queries=1)
+        self.assertEqual(len({as_json, as_npz, paged}), 3)
+
+    def test_list_etag_changes_with_its_datasets(self):
+        etag = self.client.get('/api/datasets/')['ETag']
+        newer = Dataset.objects.create(user=self.user, file='datasets/newer.csv')
+        self.assertEqual(self.client.get('/api/datasets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/api/datasets/')['ETag']
+        newer.delete()
+        self.assertEqual(self.client.get('/api/datasets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# 25 records, so streams end on a full chunk
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), RECORDS_STREAM_CHUNK_SIZE=5)
+class AsyncViewTests(TestCase):
+    """
+    Under ASGI data/ sends its streaming bodies from async iterators
+    (api.async_views); every endpoint must still answer as under WSGI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async', 'async@example.com', 'async')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.dataset = Dataset.objects.create(user=cls.user, file='datasets/async.csv')
+        types = EquipmentType.ids_for(['Pump', 'Valve'])
+        names = EquipmentName.ids_for(['Unit-\u2028', 'Unit-"1"'])
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=cls.dataset, equipment_name_id=names['Unit-\u2028' if i % 3 else 'Unit-"1"'],
+                            equipment_type_id=types['Pump' if i % 2 else 'Valve'],
+                            flowrate=100.5 + i, pressure=5 + i, temperature=60 + i)
+            for i in range(25)
+        )
+        save_summary(cls.dataset)
+        for i in range(11):
+            Dataset.objects.create(user=cls.user, file=f'datasets/other-{i}.csv')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.auth = {'authorization': f'Token {self.token.key}'}
+
+    async def body(self, response):
+        if response.streaming:
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return response.content
+
+    async def assertSameResponse(self, url, headers=None):
+        headers = {**self.auth, **(headers or {})}
+        expected = await sync_to_async(self.client.get)(url, headers=headers)
+        # Sync streams query as they are read
+        expected_body = await sync_to_async(expected.getvalue)()
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, expected.status_code, url)
+        self.assertEqual(await self.body(response), expected_body, url)
+        for header in ('Content-Type', 'Content-Encoding', 'ETag', 'Last-Modified', 'Vary', 'Allow'):
+            self.assertEqual(response.get(header), expected.get(header), f'{url} {header}')
+        return response
+
+    async def test_responses_match_drf(self):
+        base = f'/api/datasets/{self.dataset.id}'
+        for url in ('/api/datasets/', '/api/datasets/?page=2', '/api/global-datasets/?page=2',
+                    f'{base}/data/', f'{base}/data/?stream=json', f'{base}/data/?stream=ndjson',
+                    f'{base}/stats/', f'{base}/stats/extended/'):
+            await self.assertSameResponse(url)
+
+    async def test_precompressed_records(self):
+        directory = dataset_sidecar_dir(self.dataset)
+        os.makedirs(directory)
+        await sync_to_async(write_payloads)(EquipmentRecord.objects.filter(dataset=self.dataset), directory)
+        for encoding in ('br', 'gzip'):
+            response = await self.assertSameResponse(f'/api/datasets/{self.dataset.id}/data/',
+                                                     {'accept-encoding': encoding})
+            self.assertEqual(response['Content-Encoding'], encoding)
+
+    async def test_record_streams_sent_asynchronously(self):
+        base = f'/api/datasets/{self.dataset.id}'
+        for url in (f'{base}/data/', f'{base}/data/?stream=json', f'{base}/data/?stream=ndjson'):
+            response = await self.async_client.get(url, headers=self.auth)
+            self.assertTrue(response.is_async, url)
+        # Sent a block at a time, not read whole first
+        with mock.patch('api.async_views.BLOCK_SIZE', 64), self.settings(RECORDS_STREAM_CHUNK_SIZE=5):
+            response = await self.async_client.get(f'{base}/data/?stream=ndjson', headers=self.auth)
+            blocks = [block async for block in response.streaming_content]
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(len(b''.join(blocks).splitlines()), 25)
+
+    async def test_other_requests_left_to_drf(self):
+        base = f'/api/datasets/{self.dataset.id}'
+        for url in (f'{base}/data/?format=npz', f'{base}/data/?page_size=5', f'{base}/data/?stream=csv',
+                    '/api/datasets/?page=9', '/api/datasets/0/stats/', '/api/datasets/0/data/'):
+            await self.assertSameResponse(url)
+        for headers in ({'authorization': 'Token wrong'}, {'authorization': 'Basic YXN5bmM6YXN5bmM='}):
+            await self.assertSameResponse(f'{base}/data/', headers)
+        response = await self.async_client.get(f'{base}/data/')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(DATASET_RETENTION_MAX_AGE_DAYS=0, DATASET_RETENTION_FAILED_HOURS=1)
+class RetentionTests(TestCase):
+    """A user keeps their newest READY datasets; failed uploads do not count."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('retention', 'retention@example.com', 'retention')
+
+    def make_datasets(self, count, status, age):
+        datasets = [Dataset.objects.create(user=self.user, file='', status=status) for _ in range(count)]
+        Dataset.objects.filter(id__in=[d.id for d in datasets]).update(uploaded_at=timezone.now() - age)
+        return [d.id for d in datasets]
+
+    def remaining(self):
+        return set(Dataset.objects.values_list('id', flat=True))
+
+    def test_failed_uploads_do_not_push_out_ready_datasets(self):
+        ready = self.make_datasets(5, Dataset.Status.READY, timedelta(days=1))
+        # Newer than every READY dataset, so they would win a shared ranking
+        recent_failed = self.make_datasets(3, Dataset.Status.FAILED, timedelta(minutes=5))
+        old_failed = self.make_datasets(2, Dataset.Status.FAILED, timedelta(hours=2))
+
+        self.assertEqual(sweep(keep=5, user=self.user), 2)
+        self.assertEqual(self.remaining(), {*ready, *recent_failed})
+        self.assertFalse(set(old_failed) & self.remaining())
+
+    def aged_ready(self, count):
+        """``count`` READY datasets, newest first, an hour apart."""
+        return [self.make_datasets(1, Dataset.Status.READY, timedelta(hours=i + 1))[0] for i in range(count)]
+
+    def test_keeps_newest(self):
+        ready = self.aged_ready(6)
+        self.assertEqual(sweep(keep=0, user=self.user), 0)
+        self.assertEqual(sweep(keep=4, user=self.user), 2)
+        self.assertEqual(self.remaining(), set(ready[:4]))
+        self.assertEqual(sweep(keep=4, user=self.user), 0)
+
+    def test_racing_sweeps_delete_once(self):
+        ready = self.aged_ready(5)
+        batch = expired_ids(keep=2, user=self.user)
+        self.assertEqual(batch, sorted(ready[2:]))
+        self.assertEqual(claim(batch), batch)
+        # A second sweep that read the same ids before the claim wins none
+        self.assertEqual(claim(batch), [])
+        with mock.patch('api.retention.expired_ids', side_effect=[batch, []]):
+            self.assertEqual(sweep(keep=2, user=self.user), 0)
+        self.assertEqual(self.remaining(), set(ready))
+
+        self.assertEqual(resume_interrupted(), 3)
+        self.assertEqual(self.remaining(), set(ready[:2]))
+
+    def test_deleting_datasets_are_left_to_their_sweep(self):
+        ready = self.aged_ready(4)
+        Dataset.objects.filter(id=ready[0]).update(status=Dataset.Status.DELETING)
+        # Claimed elsewhere, so neither counted towards the limit nor claimed again
+        self.assertEqual(sweep(keep=2, user=self.user), 1)
+        self.assertEqual(self.remaining(), set(ready[:3]))
+        self.assertEqual(Dataset.objects.get(id=ready[0]).status, Dataset.Status.DELETING)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), REPORT_CACHE_DIR=tempfile.mkdtemp())
+class DatasetDeleteTests(TestCase):
+    """However a dataset is deleted, its records and files go with it."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('delete', 'delete@example.com', 'delete')
+
+    def ingested(self, name):
+        dataset = uploaded_dataset(self.user, ["Pump-1,Pump,10,2,60", "Valve-1,Valve,11,3,61"], name)
+        ingest_csv(dataset, dataset.file.path)
+        report = os.path.join(settings.REPORT_CACHE_DIR, f'{dataset.id}-report.pdf')
+        with open(report, 'wb') as f:
+            f.write(b'%PDF')
+        paths = [dataset.file.path, dataset_sidecar_dir(dataset), report]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        return dataset, paths
+
+    def assertDeleted(self, dataset, paths):
+        self.assertFalse(Dataset.objects.filter(id=dataset.id).exists())
+        self.assertFalse(EquipmentRecord.objects.filter(dataset_id=dataset.id).exists())
+        self.assertEqual([path for path in paths if os.path.exists(path)], [])
+
+    def test_queryset_delete_removes_files(self):
+        dataset, paths = self.ingested('queryset')
+        with self.captureOnCommitCallbacks(execute=True):
+            Dataset.objects.filter(id=dataset.id).delete()
+        self.assertDeleted(dataset, paths)
+
+    def test_user_delete_removes_files(self):
+        datasets = [self.ingested(f'user-{i}') for i in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        for dataset, paths in datasets:
+            self.assertDeleted(dataset, paths)
+
+
+@override_settings(JOB_STALE_MINUTES=15)
+class StaleJobTests(TestCase):
+    """Jobs whose worker died mid-run are failed, and their partial ingest removed."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reaper', 'reaper@example.com', 'reaper')
+
+    def running_ingest(self, heartbeat_age):
+        dataset = Dataset.objects.create(user=self.user, file='', status=Dataset.Status.PENDING)
+        types, names = EquipmentType.ids_for(['Pump']), EquipmentName.ids_for(['P-1'])
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=dataset, equipment_name_id=names['P-1'], equipment_type_id=types['Pump'],
+                            flowrate=1, pressure=2, temperature=3)
+            for _ in range(10)
+        )
+        beat = timezone.now() - heartbeat_age
+        job = Job.objects.create(kind=Job.Kind.INGEST, user=self.user, dataset=dataset,
+                                 status=Job.Status.RUNNING, started_at=beat, heartbeat_at=beat)
+        return job, dataset
+
+    def test_stale_ingest_is_failed_and_removed(self):
+        stale, stale_dataset = self.running_ingest(timedelta(hours=1))
+        live, live_dataset = self.running_ingest(timedelta(minutes=1))
+
+        self.assertEqual(reap_stale(), 1)
+        self.assertEqual(reap_stale(), 0)
+        stale.refresh_from_db()
+        stale_dataset.refresh_from_db()
+        self.assertEqual(stale.status, Job.Status.FAILED)
+        self.assertEqual(stale_dataset.status, Dataset.Status.FAILED)
+        self.assertFalse(EquipmentRecord.objects.filter(dataset=stale_dataset).exists())
+
+        live.refresh_from_db()
+        self.assertEqual(live.status, Job.Status.RUNNING)
+        self.assertEqual(EquipmentRecord.objects.filter(dataset=live_dataset).count(), 10)
+
+
+class SummaryTests(TestCase):
+    def test_known_answer(self):
+        user = User.objects.create_user('summary', 'summary@example.com', 'summary')
+        dataset = Dataset.objects.create(user=user, file='')
+        types = EquipmentType.ids_for(['Pump', 'Valve'])
+        names = EquipmentName.ids_for(['Unit'])
+        # Unsorted, with the two types interleaved
+        rows = [('Pump', 5), ('Valve', 20), ('Pump', 2), ('Pump', 9), ('Pump', 4),
+                ('Valve', 10), ('Pump', 4), ('Pump', 7), ('Pump', 5), ('Pump', 4)]
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=dataset, equipment_name_id=names['Unit'], equipment_type_id=types[eq_type],
+                            flowrate=value, pressure=3, temperature=value)
+            for eq_type, value in rows
+        )
+        summary = save_summary(dataset)
+
+        expected = {
+            # 2 4 4 4 5 5 7 9 10 20: population std, percentiles interpolated linearly
+            'overall': {'mean': 7, 'min': 2, 'max': 20, 'std': 24.2 ** 0.5, 'p50': 5, 'p95': 15.5, 'p99': 19.1},
+            'Pump': {'mean': 5, 'min': 2, 'max': 9, 'std': 2, 'p50': 4.5, 'p95': 8.3, 'p99': 8.86},
+            'Valve': {'mean': 15, 'min': 10, 'max': 20, 'std': 5, 'p50': 15, 'p95': 19.5, 'p99': 19.9},
+        }
+        actual = {'overall': summary.metrics['flowrate'],
+                  **{label: stats['flowrate'] for label, stats in summary.type_metrics.items()}}
+        self.assertEqual(actual.keys(), expected.keys())
+        for group, stats in expected.items():
+            for key, value in stats.items():
+                self.assertAlmostEqual(actual[group][key], value, msg=f'{group} {key}')
+        self.assertEqual(summary.total_count, 10)
+        self.assertEqual(summary.type_distribution, {'Pump': 8, 'Valve': 2})
+        self.assertEqual(summary.metrics['pressure']['std'], 0)
+        self.assertEqual(summary.metrics['temperature'], summary.metrics['flowrate'])
+
+
+class DownsampleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def assertSeries(self, series, x, y):
+        self.assertEqual(np.asarray(series[0]).tolist(), x)
+        self.assertEqual(np.asarray(series[1]).tolist(), y)
+
+    def test_lttb_keeps_the_largest_triangles(self):
+        # Buckets [1, 3) and [3, 6): the spike at 2 and the dip at 5 win
+        self.assertSeries(lttb([0, 1, 5, 1, 0, -4, 0], 4), [0, 2, 5, 6], [0, 5, -4, 0])
+
+    def test_lttb_length_and_endpoints(self):
+        y = np.random.default_rng(0).normal(size=1000)
+        x, sampled = lttb(y, 100)
+        self.assertEqual(len(x), 100)
+        self.assertEqual((x[0], x[-1]), (0, 999))
+        self.assertTrue((np.diff(x) > 0).all())
+        self.assertEqual(sampled.tolist(), y[x].tolist())
+
+    def test_minmax_keeps_bucket_extremes(self):
+        # Buckets [3, 1, 4, 1] and [5, 9, 2, 6]; ties keep the first row
+        self.assertSeries(minmax([3, 1, 4, 1, 5, 9, 2, 6], 4), [1, 2, 5, 6], [1, 4, 9, 2])
+
+    def test_short_input_is_unchanged(self):
+        y = [2.0, 7.0, 1.0, 8.0, 2.0]
+        for method in (lttb, minmax):
+            self.assertSeries(method(y, 10), [0, 1, 2, 3, 4], y)
+        self.assertSeries(lttb(y, 5), [0, 1, 2, 3, 4], y)
+
+    def test_series_cached_per_dataset_and_method(self):
+        user = User.objects.create_user('trend', 'trend@example.com', 'trend')
+        types, names = EquipmentType.ids_for(['Pump']), EquipmentName.ids_for(['P-1'])
+        datasets = []
+        for values in ([0, 1, 5, 1, 0, -4, 0], [3, 1, 4, 1, 5, 9, 2, 6]):
+            dataset = Dataset.objects.create(user=user, file='')
+            EquipmentRecord.objects.bulk_create(
+                EquipmentRecord(dataset=dataset, equipment_name_id=names['P-1'], equipment_type_id=types['Pump'],
+                                flowrate=value, pressure=0, temperature=0)
+                for value in values
+            )
+            datasets.append(dataset)
+        first, second = datasets
+
+        expected = {
+            (first, 'lttb'): {'x': [0, 2, 5, 6], 'y': [0, 5, -4, 0]},
+            (first, 'minmax'): {'x': [0, 2, 3, 5], 'y': [0, 5, 1, -4]},
+            (second, 'lttb'): {'x': [0, 3, 5, 7], 'y': [3, 1, 9, 6]},
+            (second, 'minmax'): {'x': [1, 2, 5, 6], 'y': [1, 4, 9, 2]},
+        }
+        for (dataset, method), series in expected.items():
+            self.assertEqual(trend_series(dataset, 'flowrate', points=4, method=method), series)
+        # Served from the cache once computed
+        EquipmentRecord.objects.all().delete()
+        for (dataset, method), series in expected.items():
+            self.assertEqual(trend_series(dataset, 'flowrate', points=4, method=method), series)
+
+class HistogramTests(TestCase):
+    def test_width_bins(self):
+        values = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 10], dtype=float)
+        edges = bin_edges(values, 5)
+        self.assertEqual(edges.tolist(), [0, 2, 4, 6, 8, 10])
+        counts = bin_counts(values, edges)
+        # Bins are closed on the left; the maximum lands in the last one, as in np.histogram
+        self.assertEqual(counts.tolist(), [2, 2, 2, 2, 2])
+        self.assertEqual(counts.tolist(), np.histogram(values, edges)[0].tolist())
+
+    def test_quantile_bins(self):
+        values = np.array([8, 1, 7, 2, 6, 3, 5, 4], dtype=float)
+        edges = bin_edges(values, 4, mode='quantile')
+        self.assertEqual(edges.tolist(), [1, 2.75, 4.5, 6.25, 8])
+        self.assertEqual(bin_counts(values, edges).tolist(), [2, 2, 2, 2])
+
+    def test_counts_by_type_add_up(self):
+        values = np.random.default_rng(0).normal(size=500)
+        codes = np.arange(500, dtype=np.int32) % 3
+        for mode in ('width', 'quantile'):
+            edges = bin_edges(values, 20, mode)
+            counts = bin_counts(values, edges)
+            matrix = bin_counts(values, edges, codes, 3)
+            self.assertEqual(counts.sum(), 500)
+            self.assertEqual(bin_counts(values[[values.argmax()]], edges)[-1], 1)
+            self.assertEqual(matrix.sum(axis=0).tolist(), counts.tolist())
+            self.assertEqual(matrix.sum(axis=1).tolist(), np.bincount(codes).tolist())
+
+    def test_constant_and_empty_columns(self):
+        constant = np.full(7, 5.0)
+        for mode in ('width', 'quantile'):
+            edges = bin_edges(constant, 4, mode)
+            self.assertEqual(bin_counts(constant, edges).sum(), 7, mode)
+            self.assertEqual(bin_counts(constant, edges, np.zeros(7, dtype=np.int32), 1).sum(), 7, mode)
+
+            empty = np.empty(0)
+            edges = bin_edges(empty, 4, mode)
+            self.assertEqual(len(edges), 5)
+            self.assertEqual(bin_counts(empty, edges).tolist(), [0, 0, 0, 0])
+            self.assertEqual(bin_counts(empty, edges, np.empty(0, dtype=np.int32), 0).shape, (0, 4))
+
+
+# 23 records: neither the pages nor the stream chunks divide them evenly
+@override_settings(RECORDS_STREAM_CHUNK_SIZE=4)
+class RecordPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('paging', 'paging@example.com', 'paging')
+        cls.dataset, other = (Dataset.objects.create(user=cls.user, file='') for _ in range(2))
+        types, names = EquipmentType.ids_for(['Pump']), EquipmentName.ids_for(['P-é'])
+        # Interleaved with another dataset's, so the ids have gaps
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=other if i % 3 == 0 else cls.dataset, equipment_name_id=names['P-é'],
+                            equipment_type_id=types['Pump'], flowrate=i / 7, pressure=i, temperature=-i)
+            for i in range(35)
+        )
+        cls.ids = list(EquipmentRecord.objects.filter(dataset=cls.dataset).order_by('id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/datasets/{self.dataset.id}/data/'
+
+    def test_cursor_walk_visits_every_record_once(self):
+        self.assertEqual(len(self.ids), 23)
+        seen, url = [], f'{self.url}?page_size=5'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 5)
+            seen += [record['id'] for record in page['results']]
+            url = page['next']
+        self.assertEqual(seen, self.ids)
+
+    def test_streams_parse_to_the_plain_records(self):
+        expected = self.client.get(self.url).json()
+        self.assertEqual([record['id'] for record in expected], self.ids)
+
+        response = self.client.get(self.url, {'stream': 'json'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+
+        response = self.client.get(self.url, {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+
+def npz_frame(content):
+    """The desktop client's columns_to_frame (desktop-frontend/ui/dashboard.py)."""
+    with np.load(io.BytesIO(content), allow_pickle=False) as z:
+        return pd.DataFrame({
+            'id': z['id'],
+            'equipment_name': pd.Categorical.from_codes(z['equipment_name_codes'], z['equipment_name_labels']),
+            'equipment_type': pd.Categorical.from_codes(z['equipment_type_codes'], z['equipment_type_labels']),
+            'flowrate': z['flowrate'],
+            'pressure': z['pressure'],
+            'temperature': z['temperature'],
+            'dataset': int(z['dataset']),
+        })
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ColumnarPayloadTests(TestCase):
+    """The npz records decode to the same frame as the JSON ones."""
+
+    def test_npz_round_trips_to_the_json_frame(self):
+        user = User.objects.create_user('npz', 'npz@example.com', 'npz')
+        dataset = uploaded_dataset(user, ["Pump-1,Pump,10.5,2,60", "Pümpe-2,,11,3,61",
+                                          ",Valve,-12.25,4,62", "Pump-1,Pump,9,5,1e-3"], 'npz')
+        ingest_csv(dataset, dataset.file.path)
+        Dataset.objects.filter(id=dataset.id).update(status=Dataset.Status.READY)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/datasets/{dataset.id}/data/'
+
+        expected = pd.DataFrame(client.get(url).json())
+        self.assertIn('nan', expected['equipment_type'].tolist())
+        for source in ('sidecar', 'records'):
+            if source == 'records':
+                remove_sidecar(dataset)
+            response = client.get(url, {'format': 'npz'})
+            self.assertEqual(response.status_code, 200, source)
+            frame = npz_frame(response.content).astype({'equipment_name': object, 'equipment_type': object})
+            pd.testing.assert_frame_equal(frame, expected[frame.columns], check_dtype=False, obj=source)
+
+
+class RecordEncoderTests(TestCase):
+    def test_matches_serializer_and_renderer(self):
+        user = User.objects.create_user('encoder', 'encoder@example.com', 'encoder')
+        dataset = Dataset.objects.create(user=user, file='')
+        labels = ['', 'Pümpe "A"\\1', '熱交換器', 'Line\u2028Break\n', 'Tab\tΩ']
+        types = EquipmentType.ids_for(labels)
+        names = EquipmentName.ids_for(labels)
+        values = [0, 0.1, -0.0, 1e-07, 1e20, 123.456, -5]
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=dataset, equipment_name_id=names[labels[i % len(labels)]],
+                            equipment_type_id=types[labels[-i % len(labels)]],
+                            flowrate=values[i % len(values)], pressure=values[-i % len(values)],
+                            temperature=i / 3)
+            for i in range(len(labels) * len(values))
+        )
+        records = EquipmentRecord.objects.filter(dataset=dataset)
+        expected = JSONRenderer().render(EquipmentRecordSerializer(records.order_by('id'), many=True).data)
+        self.assertEqual(encode_records(records), expected)
+        self.assertEqual(encode_records(records.none()), b'[]')
+
+
+@override_settings(EVENTS_TICKET_SECONDS=60)
+class EventsTicketTests(TestCase):
+    """The event stream opens with a short-lived ticket, never with the token in its URL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('events', 'events@example.com', 'events')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def events(self, **params):
+        response = self.client.get('/api/events/', params)
+        # Leaves the (WSGI) stream unread
+        response.close()
+        return response.status_code
+
+    def test_ticket_opens_the_stream(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.token.key, response.data['ticket'])
+        self.assertEqual(self.events(ticket=response.data['ticket']), 200)
+
+    def test_token_and_bad_tickets_are_refused(self):
+        self.assertEqual(self.events(token=self.token.key), 401)
+        self.assertEqual(self.events(ticket=make_ticket(self.user) + 'x'), 401)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 120):
+            expired = make_ticket(self.user)
+        self.assertEqual(self.events(ticket=expired), 401)
+        self.assertEqual(APIClient().post('/api/events/ticket/').status_code, 401)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class IngestTests(TestCase):
+    def test_blank_labels_are_stored_as_nan(self):
+        user = User.objects.create_user('ingest', 'ingest@example.com', 'ingest')
+        dataset = Dataset.objects.create(user=user, file='')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+                    "Pump-1,,10,2,60\n"
+                    ",Valve,11,3,61\n")
+        self.addCleanup(os.unlink, f.name)
+
+        self.assertEqual(ingest_csv(dataset, f.name, write_columns=False).rows, 2)
+        labels = EquipmentRecord.objects.filter(dataset=dataset).order_by('id').values_list(
+            'equipment_name__name', 'equipment_type__name')
+        self.assertEqual(list(labels), [('Pump-1', 'nan'), ('nan', 'Valve')])
+
+    def test_sidecar_summary_matches_the_records(self):
+        user = User.objects.create_user('columns', 'columns@example.com', 'columns')
+        dataset = uploaded_dataset(user, ["Pump-1,Pump,10,2,60", "Pump-2,,11,3,61",
+                                          ",Valve,12.5,4,62", "Pump-3,Pump,9,5,63"])
+        ingest_csv(dataset, dataset.file.path)
+        self.assertTrue(os.path.isdir(dataset_sidecar_dir(dataset)))
+        from_columns = compute_summary(dataset)
+
+        remove_sidecar(dataset)
+        self.assertEqual(compute_summary(dataset), from_columns)
+        self.assertEqual(from_columns['type_distribution'], {'Pump': 2, 'Valve': 1, 'nan': 1})
+
+    @override_settings(INGEST_CHUNK_SIZE=3)
+    def test_failure_mid_file_removes_committed_chunks(self):
+        user = User.objects.create_user('partial', 'partial@example.com', 'partial')
+        # The first chunk parses and commits; the second has a bad Flowrate
+        dataset = uploaded_dataset(user, [f"Pump-{i},Pump,{i},2,60" for i in range(5)] + ["Pump-5,Pump,n/a?,2,60"],
+                                   'partial')
+        job = Job.objects.create(kind=Job.Kind.INGEST, user=user, dataset=dataset, status=Job.Status.RUNNING)
+        run_job(job)
+
+        job.refresh_from_db()
+        dataset.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.rows_processed, 3)
+        self.assertEqual(dataset.status, Dataset.Status.FAILED)
+        self.assertFalse(EquipmentRecord.objects.filter(dataset=dataset).exists())
+        # Upload, sidecar and its temporary directory are all gone
+        stem = os.path.join(settings.MEDIA_ROOT, 'datasets', 'partial')
+        self.assertFalse([path for path in (f'{stem}.csv', f'{stem}.columns', f'{stem}.columns.tmp')
+                          if os.path.exists(path)])
+
+    def test_failure_after_close_removes_sidecar(self):
+        user = User.objects.create_user('sidecar', 'sidecar@example.com', 'sidecar')
+        dataset = Dataset.objects.create(user=user, file='')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'upload.csv')
+        with open(path, 'w') as f:
+            f.write("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+                    "Pump-1,Pump,10,2,60\n")
+
+        with mock.patch('api.ingest.save_summary', side_effect=RuntimeError("summary failed")):
+            with self.assertRaises(RuntimeError):
+                ingest_csv(dataset, path)
+        self.assertEqual(os.listdir(directory), ['upload.csv'])
+        self.assertFalse(EquipmentRecord.objects.filter(dataset=dataset).exists())
+
+
+class ChartPoolTests(TestCase):
+    """A chart pool broken mid-render is replaced instead of failing the report."""
+
+    def pool(self, broken):
+        pool = mock.Mock()
+        future = Future()
+        if broken:
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        else:
+            future.set_result(b'pooled')
+        pool.submit.return_value = future
+        return pool
+
+    def render(self, *pools):
+        reports._chart_pool = pools[0]
+        self.addCleanup(setattr, reports, '_chart_pool', None)
+        with mock.patch.object(reports, 'chart_pool', side_effect=pools):
+            return reports.submit_chart(lambda: b'inline').result()
+
+    def test_retries_in_a_fresh_pool(self):
+        self.assertEqual(self.render(self.pool(broken=True), self.pool(broken=False)), b'pooled')
+        self.assertIsNone(reports._chart_pool)
+
+    def test_renders_inline_if_the_retry_breaks_too(self):
+        self.assertEqual(self.render(self.pool(broken=True), self.pool(broken=True)), b'inline')
+
+
+@override_settings(REPORT_PROCESSES=0, REPORT_MAX_ROWS=10, RECORDS_STREAM_CHUNK_SIZE=4)
+class ReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('report', 'report@example.com', 'report')
+        cls.dataset = Dataset.objects.create(user=cls.user, file='')
+        types = EquipmentType.ids_for(['Pump', 'Valve'])
+        names = EquipmentName.ids_for(f'Unit-{i}' for i in range(25))
+        EquipmentRecord.objects.bulk_create(
+            EquipmentRecord(dataset=cls.dataset, equipment_name_id=names[f'Unit-{i}'],
+                            equipment_type_id=types['Pump' if i % 2 else 'Valve'],
+                            flowrate=i, pressure=2 * i, temperature=50 + i)
+            for i in range(25)
+        )
+        save_summary(cls.dataset)
+
+    def render(self, charts_mode='raster'):
+        """The strings drawn on the report's pages, in order."""
+        drawn = []
+        draw_string = Canvas.drawString
+
+        def record(canvas, x, y, text, *args, **kwargs):
+            drawn.append(text)
+            return draw_string(canvas, x, y, text, *args, **kwargs)
+
+        out = io.BytesIO()
+        with mock.patch.object(Canvas, 'drawString', autospec=True, side_effect=record):
+            render_report(self.dataset, out, charts_mode)
+        self.assertTrue(out.getvalue().startswith(b'%PDF'))
+        return drawn
+
+    def test_table_stops_at_the_cap(self):
+        drawn = self.render()
+        self.assertEqual([text for text in drawn if text.startswith('Unit-')], [f'Unit-{i}' for i in range(10)])
+
+        appendix = drawn[drawn.index("Remaining Records by Type"):]
+        self.assertIn("The table lists the first 10 of 25 records; the remaining 15 are summarized below.",
+                      appendix)
+        # Rows 10-24: the even ones are Valves, at temperatures 60-74
+        self.assertEqual(appendix[appendix.index('Pump'):appendix.index('Pump') + 6],
+                         ['Pump', '7', '17.0', '34.0', '67.0', '73.0'])
+        self.assertEqual(appendix[appendix.index('Valve'):appendix.index('Valve') + 6],
+                         ['Valve', '8', '17.0', '34.0', '67.0', '74.0'])
+
+    def test_no_appendix_under_the_cap(self):
+        with self.settings(REPORT_MAX_ROWS=25):
+            drawn = self.render()
+        self.assertEqual(len([text for text in drawn if text.startswith('Unit-')]), 25)
+        self.assertNotIn("Remaining Records by Type", drawn)
+
+    def test_cache_key_follows_the_cap(self):
+        key = report_key(self.dataset, 'raster')
+        with self.settings(REPORT_MAX_ROWS=20):
+            self.assertNotEqual(report_key(self.dataset, 'raster'), key)
+        self.assertEqual(report_key(self.dataset, 'raster'), key)
+
+    def test_vector_charts(self):
+        with mock.patch.object(Canvas, 'drawImage', autospec=True) as draw_image, \
+                mock.patch.object(reports.renderPDF, 'draw', wraps=reports.renderPDF.draw) as draw_vector:
+            self.render('vector')
+            self.assertEqual((draw_image.call_count, draw_vector.call_count), (0, 2))
+            self.render('raster')
+            self.assertEqual((draw_image.call_count, draw_vector.call_count), (2, 2))
+        self.assertNotEqual(report_key(self.dataset, 'vector'), report_key(self.dataset, 'raster'))
@@ -1,15 +1,28 @@
 from django.urls import path
-from .views import (DatasetUploadView, DatasetListView, GlobalDatasetListView, 
-                    DatasetRecordsView, DatasetStatsView, DatasetPDFView, UserRegistrationView)
+from .views import (DatasetUploadView, DatasetListView, GlobalDatasetListView, DatasetStatsView,
+                    DatasetExtendedStatsView, DatasetPDFView, DatasetStatusView, DatasetTrendView,
+                    DatasetHistogramView, EventsTicketView, ReportJobView, ReportDownloadView,
+                    UserRegistrationView)
 from rest_framework.authtoken import views
+from .events import dataset_events
+# DatasetRecordsView, with its streaming bodies sent asynchronously under ASGI
+from .async_views import dataset_records
 
 urlpatterns = [
     path('upload/', DatasetUploadView.as_view(), name='dataset-upload'),
     path('datasets/', DatasetListView.as_view(), name='dataset-list'),
     path('global-datasets/', GlobalDatasetListView.as_view(), name='global-dataset-list'),
-    path('datasets/<int:id>/data/', DatasetRecordsView.as_view(), name='dataset-records'),
+    path('datasets/<int:id>/data/', dataset_records, name='dataset-records'),
     path('datasets/<int:id>/stats/', DatasetStatsView.as_view(), name='dataset-stats'),
+    path('datasets/<int:id>/stats/extended/', DatasetExtendedStatsView.as_view(), name='dataset-stats-extended'),
+    path('datasets/<int:id>/status/', DatasetStatusView.as_view(), name='dataset-status'),
+    path('datasets/<int:id>/trend/', DatasetTrendView.as_view(), name='dataset-trend'),
+    path('datasets/<int:id>/histogram/', DatasetHistogramView.as_view(), name='dataset-histogram'),
     path('datasets/<int:id>/pdf/', DatasetPDFView.as_view(), name='dataset-pdf'),
+    path('events/', dataset_events, name='dataset-events'),
+    path('events/ticket/', EventsTicketView.as_view(), name='events-ticket'),
+    path('reports/<int:job_id>/', ReportJobView.as_view(), name='report-job'),
+    path('reports/<int:job_id>/download/', ReportDownloadView.as_view(), name='report-download'),
     path('api-token-auth/', views.obtain_auth_token),
     path('auth/registration/', UserRegistrationView.as_view(), name='user-registration'),
 ]
@@ -0,0 +1,126 @@
+"""
+Report charts as reportlab vector drawings.
+
+The vector counterpart of api.charts: the same charts, built from the same
+pre-aggregated data (downsampled trend series and the stored summary), but
+drawn as PDF paths instead of embedded PNGs. Their cost and size follow the
+number of plotted points rather than the image resolution, and they stay
+sharp at any zoom.
+"""
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.doughnut import Doughnut
+from reportlab.graphics.charts.legends import LineLegend
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+
+TEAL = colors.HexColor('#0d9488')
+TEAL_FILL = colors.Color(TEAL.red, TEAL.green, TEAL.blue, alpha=0.1)
+AMBER = colors.HexColor('#f59e0b')
+GRID = colors.HexColor('#e5e7eb')
+TITLE = colors.HexColor('#333333')
+LABEL = colors.HexColor('#555555')
+DONUT_COLORS = [colors.HexColor(c) for c in ('#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4')]
+
+
+def _title(drawing, x, y, text, size=10):
+    drawing.add(String(x, y, text, fontName='Helvetica-Bold', fontSize=size,
+                       fillColor=TITLE, textAnchor='middle'))
+
+
+def _style_value_axis(axis):
+    axis.labels.fontName = 'Helvetica'
+    axis.labels.fontSize = 7
+    axis.labels.fillColor = LABEL
+    axis.strokeColor = None
+    axis.visibleTicks = 0
+    axis.visibleGrid = 1
+    axis.gridStrokeColor = GRID
+    axis.gridStrokeWidth = 0.5
+
+
+def trend_drawing(flow, press, width=520, height=180):
+    """Flowrate and pressure trends from downsampled ``{'x', 'y'}`` series."""
+    drawing = Drawing(width, height)
+    _title(drawing, width / 2, height - 14, 'Process Trends Overview', size=11)
+
+    plot = LinePlot()
+    plot.x, plot.y = 40, 22
+    plot.width, plot.height = width - 55, height - 58
+    plot.data = [list(zip(flow['x'], flow['y'])), list(zip(press['x'], press['y']))]
+    plot.joinedLines = 1
+    plot.lines[0].strokeColor = TEAL
+    plot.lines[0].strokeWidth = 1
+    # Flood fill under the flowrate line, drawn again on top of the fill
+    plot.lines[0].inFill = 2
+    plot.lines[0].fillColor = TEAL_FILL
+    plot.lines[1].strokeColor = AMBER
+    plot.lines[1].strokeWidth = 1
+    plot.lines[1].strokeDashArray = (4, 2)
+    last = max([*flow['x'], *press['x']], default=1)
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = 0, max(last, 1)
+    _style_value_axis(plot.xValueAxis)
+    _style_value_axis(plot.yValueAxis)
+    drawing.add(plot)
+
+    legend = LineLegend()
+    legend.x, legend.y = plot.x + 8, height - 30
+    legend.alignment = 'right'
+    legend.columnMaximum = 1
+    legend.fontName, legend.fontSize = 'Helvetica', 8
+    legend.dx, legend.dy = 14, 0
+    legend.deltax = 70
+    legend.colorNamePairs = [(TEAL, 'Flowrate'), (AMBER, 'Pressure')]
+    drawing.add(legend)
+    return drawing
+
+
+def distribution_drawing(type_distribution, flow_by_type, width=520, height=160):
+    """Equipment-type donut next to average flowrate per type, from summary dicts."""
+    drawing = Drawing(width, height)
+    half = width / 2
+
+    counts = sorted(type_distribution.items(), key=lambda item: item[1], reverse=True)
+    total = sum(count for _, count in counts) or 1
+    _title(drawing, half / 2, height - 14, 'Equipment Distribution')
+    if counts:
+        donut = Doughnut()
+        size = height - 50
+        donut.x, donut.y = (half - size) / 2, 16
+        donut.width = donut.height = size
+        donut.data = [count for _, count in counts]
+        donut.labels = [f"{label} {count / total:.1%}" for label, count in counts]
+        donut.innerRadiusFraction = 0.7
+        donut.startAngle = 90
+        donut.slices.strokeColor = colors.white
+        donut.slices.strokeWidth = 0.5
+        donut.slices.fontName, donut.slices.fontSize = 'Helvetica', 7
+        donut.slices.fontColor = LABEL
+        donut.slices.labelRadius = 1.25
+        donut.checkLabelOverlap = 1
+        for i in range(len(counts)):
+            donut.slices[i].fillColor = DONUT_COLORS[i % len(DONUT_COLORS)]
+        drawing.add(donut)
+
+    _title(drawing, half + half / 2, height - 14, 'Avg Flowrate by Type')
+    if flow_by_type:
+        bars = VerticalBarChart()
+        bars.x, bars.y = half + 35, 38
+        bars.width, bars.height = half - 50, height - 72
+        bars.data = [list(flow_by_type.values())]
+        bars.barWidth = 6
+        bars.groupSpacing = 10
+        bars.bars[0].fillColor = colors.Color(TEAL.red, TEAL.green, TEAL.blue, alpha=0.8)
+        bars.bars[0].strokeColor = None
+        bars.categoryAxis.categoryNames = list(flow_by_type)
+        bars.categoryAxis.strokeColor = None
+        bars.categoryAxis.labels.angle = 45
+        bars.categoryAxis.labels.boxAnchor = 'ne'
+        bars.categoryAxis.labels.dx, bars.categoryAxis.labels.dy = 2, -2
+        bars.categoryAxis.labels.fontName = 'Helvetica'
+        bars.categoryAxis.labels.fontSize = 7
+        bars.categoryAxis.labels.fillColor = LABEL
+        bars.valueAxis.valueMin = 0
+        _style_value_axis(bars.valueAxis)
+        drawing.add(bars)
+    return drawing
@@ -3,16 +3,30 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import patch_vary_headers
 
-from .models import Dataset, EquipmentRecord
-from .serializers import DatasetSerializer, EquipmentRecordSerializer
-
-import pandas as pd
-from reportlab.pdfgen import canvas
-import io
+from .models import Dataset, EquipmentRecord, Job
+from .serializers import DatasetSerializer, EquipmentRecordSerializer, JobSerializer
+from .jobs import enqueue
+from .columnar import npz_payload
+from .stats import get_summary, stats_payload, extended_stats_payload
+from .pagination import RecordCursorPagination
+from .streaming import STREAM_FORMATS, encode_records, stream_records
+from .payloads import open_payload
+from .conditional import (dataset_validators, list_validators, make_etag, not_modified,
+                          set_validators, summary_validators)
+from .renderers import ColumnarRenderer
+from .downsample import (DEFAULT_POINTS, MAX_POINTS, METHODS as DOWNSAMPLE_METHODS,
+                         parse_metrics, trend_series)
+from .histogram import DEFAULT_BINS, MAX_BINS, MODES as HISTOGRAM_MODES, histograms
+from .reports import CHART_MODES, get_report
+from .report_cache import report_etag
+from .authentication import make_ticket
 
 class UserRegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -47,348 +61,296 @@ class DatasetUploadView(APIView):
     def post(self, request, *args, **kwargs):
         file_serializer = DatasetSerializer(data=request.data)
         if file_serializer.is_valid():
-            # Attach user
-            dataset = file_serializer.save(user=request.user)
+            # Attach user; the dataset stays hidden from lists until ingest finishes
+            dataset = file_serializer.save(user=request.user, status=Dataset.Status.PENDING)
             
+            # Process CSV in the background
+            job = enqueue(Job.Kind.INGEST, request.user, dataset)
             
-            # Process CSV
-            try:
-                df = pd.read_csv(dataset.file.path)
-                # Expected columns: "Equipment Name,Type,Flowrate,Pressure,Temperature"
-                
-                records = []
-                for _, row in df.iterrows():
-                    records.append(EquipmentRecord(
-                        dataset=dataset,
-                        equipment_name=row['Equipment Name'],
-                        equipment_type=row['Type'],
-                        flowrate=row['Flowrate'],
-                        pressure=row['Pressure'],
-                        temperature=row['Temperature']
-                    ))
-                EquipmentRecord.objects.bulk_create(records)
-                
-                return Response(file_serializer.data, status=status.HTTP_201_CREATED)
-            except Exception as e:
-                dataset.delete()
-                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                **file_serializer.data,
+                "job_id": job.id,
+                "status": job.status,
+            }, status=status.HTTP_202_ACCEPTED)
         return Response(file_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class DatasetListView(generics.ListAPIView):
+class DatasetStatusView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        job = (Job.objects.filter(dataset_id=id, dataset__user=request.user, kind=Job.Kind.INGEST)
+               .order_by('-id').first())
+        if job is None:
+            return Response({"error": "No ingest job found for this dataset"}, status=404)
+        return Response(JobSerializer(job).data)
+
+class EventsTicketView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request):
+        # Opens api/events/ as ?ticket=, in place of the token
+        return Response({"ticket": make_ticket(request.user),
+                         "expires_in": settings.EVENTS_TICKET_SECONDS})
+
+class ConditionalListMixin:
+    """ETag / Last-Modified for dataset lists, see api.conditional.list_validators."""
+
+    def get_jobs(self):
+        # Jobs whose completion can change the list
+        return Job.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        validators = list_validators(request, self.get_queryset(), self.get_jobs())
+        if validators[0]:
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+        response = super().list(request, *args, **kwargs)
+        if validators[0]:
+            set_validators(response, *validators)
+        return response
+
+class DatasetListView(ConditionalListMixin, generics.ListAPIView):
     serializer_class = DatasetSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Dataset.objects.filter(user=self.request.user).order_by('-uploaded_at')
+        return Dataset.objects.filter(user=self.request.user, status=Dataset.Status.READY).order_by('-uploaded_at')
+
+    def get_jobs(self):
+        return Job.objects.filter(user=self.request.user)
 
-class GlobalDatasetListView(generics.ListAPIView):
-    queryset = Dataset.objects.all().order_by('-uploaded_at')
+class GlobalDatasetListView(ConditionalListMixin, generics.ListAPIView):
+    queryset = Dataset.objects.filter(status=Dataset.Status.READY).order_by('-uploaded_at')
     serializer_class = DatasetSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 class DatasetRecordsView(generics.ListAPIView):
+    """
+    All records of a dataset as one JSON list (sent pre-compressed from
+    disk when the client accepts it, see api.payloads, else encoded directly
+    from values_list rows, see streaming.RecordEncoder), or, for large datasets:
+      ?stream=json|ndjson          encoded incrementally from a DB cursor
+      ?cursor=...&page_size=N      keyset pages on (dataset_id, id)
+      Accept: application/vnd.chemviz.columns+npz (or ?format=npz)
+                                   columnar NumPy archive, see ColumnarRenderer
+    """
     serializer_class = EquipmentRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarRenderer]
+    # Send the encoded JSON list as ?stream=json does, not encoded whole
+    # first; see api.async_views
+    stream_json = False
+    
+    @property
+    def paginator(self):
+        # Keep the unpaginated response unless the client asks for pages
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            keyset = 'cursor' in params or 'page_size' in params
+            self._paginator = RecordCursorPagination() if keyset else None
+        return self._paginator
     
     def get_queryset(self):
         dataset_id = self.kwargs['id']
-        return EquipmentRecord.objects.filter(dataset_id=dataset_id)
+        return (EquipmentRecord.objects.filter(dataset_id=dataset_id)
+                .select_related('equipment_name', 'equipment_type').order_by('id'))
+    
+    def list(self, request, *args, **kwargs):
+        # One dataset lookup serves the 304 check and every format below. Until
+        # its ingest is done, a dataset's records are partial (or none)
+        self.dataset = generics.get_object_or_404(Dataset, id=self.kwargs['id'], status=Dataset.Status.READY)
+        validators = dataset_validators(request, self.dataset)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        response = self.records_response(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, *validators)
+        return response
+
+    def records_response(self, request, *args, **kwargs):
+        fmt = request.query_params.get('stream')
+        if fmt:
+            if fmt not in STREAM_FORMATS:
+                return Response({"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return stream_records(self.get_queryset(), fmt)
+        if request.accepted_renderer.format == ColumnarRenderer.format:
+            return Response(npz_payload(self.dataset, self.get_queryset()))
+        renderer = request.accepted_renderer
+        if (self.paginator is None and type(renderer) is JSONRenderer
+                and renderer.get_indent(request.accepted_media_type, {}) is None):
+            return self.json_response(request)
+        return super().list(request, *args, **kwargs)
+
+    def json_response(self, request):
+        payload = open_payload(self.dataset, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if payload:
+            # Compressed at ingest (see api.payloads); sent as is
+            f, encoding = payload
+            response = FileResponse(f, content_type=JSONRenderer.media_type)
+            del response['Content-Disposition']
+            response['Content-Encoding'] = encoding
+        elif self.stream_json:
+            response = stream_records(self.get_queryset(), 'json')
+        else:
+            # The serializer's exact output, encoded straight from values_list rows
+            response = HttpResponse(encode_records(self.get_queryset()), content_type=JSONRenderer.media_type)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors have no columnar form; send them as JSON
+        if (isinstance(getattr(request, 'accepted_renderer', None), ColumnarRenderer)
+                and not isinstance(getattr(response, 'data', None), bytes)):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
 
-class DatasetStatsView(APIView):
+class SummaryView(APIView):
+    """Stats read from the stored DatasetSummary, revalidated on its computed_at."""
     permission_classes = [permissions.IsAuthenticated]
+    extended = False
+
+    def payload(self, summary):
+        return stats_payload(summary)
+
     def get(self, request, id):
-        records = EquipmentRecord.objects.filter(dataset_id=id)
-        if not records.exists():
+        etag, computed_at = summary_validators(request, id)
+        if etag:
+            response = not_modified(request, etag, computed_at)
+            if response is not None:
+                return response
+        summary = get_summary(id, extended=self.extended)
+        if summary is None or not summary.total_count:
              return Response({"error": "Dataset not found or empty"}, status=404)
         
-        total_count = records.count()
-        avg_flow = records.aggregate(Avg('flowrate'))['flowrate__avg']
-        avg_press = records.aggregate(Avg('pressure'))['pressure__avg']
-        avg_temp = records.aggregate(Avg('temperature'))['temperature__avg']
-        
-        type_dist = records.values('equipment_type').annotate(count=Count('equipment_type'))
-        dist_dict = {item['equipment_type']: item['count'] for item in type_dist}
-        
-        return Response({
-            "total_count": total_count,
-            "average_flowrate": avg_flow,
-            "average_pressure": avg_press,
-            "average_temperature": avg_temp,
-            "type_distribution": dist_dict
-        })
+        # From the summary served, which get_summary may just have (re)built
+        response = Response(self.payload(summary))
+        return set_validators(response, make_etag(request, id, summary.computed_at), summary.computed_at)
 
-from reportlab.lib.utils import ImageReader
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+class DatasetStatsView(SummaryView):
+    pass
 
-class DatasetPDFView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-    def get(self, request, id):
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer)
-        width, height = 595.27, 841.89 # A4 Size
+class DatasetExtendedStatsView(SummaryView):
+    extended = True
 
-        # --- COLORS & FONTS ---
-        TEAL_MAIN = (0.05, 0.58, 0.53) # #0d9488
-        TEAL_DARK = (0.0, 0.3, 0.28) 
-        TEAL_LIGHT = (0.94, 0.99, 0.98) # #f0fdfa
-        GRAY_TEXT = (0.2, 0.2, 0.2)
-        GRAY_SUB = (0.5, 0.5, 0.5)
-        GRAY_LINE = (0.9, 0.9, 0.9)
-        
-        # --- HEADER ---
-        # Draw top banner
-        p.setFillColorRGB(*TEAL_MAIN)
-        p.rect(0, height - 80, width, 80, fill=1, stroke=0)
-        
-        # Logo placeholder (Text for now)
-        p.setFont("Helvetica-Bold", 28)
-        p.setFillColorRGB(1, 1, 1)
-        p.drawString(40, height - 50, "ChemViz")
-        
-        p.setFont("Helvetica", 12)
-        p.drawString(40, height - 68, "Advanced Chemical Process Analytics")
+    def payload(self, summary):
+        return extended_stats_payload(summary)
 
-        # Report Info (Right aligned)
-        from datetime import datetime
-        p.setFont("Helvetica-Bold", 14)
-        p.drawRightString(width - 40, height - 45, "ANALYTICAL REPORT")
+class DatasetTrendView(APIView):
+    """Downsampled metric series: ?points=N&metrics=flowrate,pressure&method=lttb|minmax"""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        dataset = generics.get_object_or_404(Dataset, id=id, status=Dataset.Status.READY)
+        try:
+            points = int(request.query_params.get('points', DEFAULT_POINTS))
+            metrics = parse_metrics(request.query_params.get('metrics'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        method = request.query_params.get('method', 'lttb')
+        if method not in DOWNSAMPLE_METHODS:
+            return Response({"error": f"method must be one of: {', '.join(DOWNSAMPLE_METHODS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        points = min(max(points, 3), MAX_POINTS)
         
-        p.setFont("Helvetica", 9)
-        p.drawRightString(width - 40, height - 62, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        p.drawRightString(width - 40, height - 74, f"Dataset ID: #{id}")
-
-        # --- FOOTER HELPER ---
-        def draw_footer(canvas, page_num):
-            canvas.saveState()
-            canvas.setStrokeColorRGB(*GRAY_LINE)
-            canvas.line(40, 40, width - 40, 40)
-            canvas.setFont("Helvetica", 8)
-            canvas.setFillColorRGB(*GRAY_SUB)
-            canvas.drawString(40, 25, "ChemViz Analytics Platform • Confidential Report")
-            canvas.drawRightString(width - 40, 25, f"Page {page_num}")
-            canvas.restoreState()
+        return Response({
+            "dataset": dataset.id,
+            "method": method,
+            "points": points,
+            "series": {metric: trend_series(dataset, metric, points, method) for metric in metrics},
+        })
 
-        # --- CONTENT ---
-        records = EquipmentRecord.objects.filter(dataset_id=id)
-        total = records.count()
+class DatasetHistogramView(APIView):
+    """Binned distributions: ?bins=N&metrics=...&mode=width|quantile&by=type"""
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, id):
+        dataset = generics.get_object_or_404(Dataset, id=id, status=Dataset.Status.READY)
+        try:
+            bins = int(request.query_params.get('bins', DEFAULT_BINS))
+            metrics = parse_metrics(request.query_params.get('metrics'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        mode = request.query_params.get('mode', 'width')
+        if mode not in HISTOGRAM_MODES:
+            return Response({"error": f"mode must be one of: {', '.join(HISTOGRAM_MODES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bins = min(max(bins, 1), MAX_BINS)
+        by_type = request.query_params.get('by') == 'type'
         
-        if total > 0:
-            avg_flow = records.aggregate(Avg('flowrate'))['flowrate__avg']
-            avg_press = records.aggregate(Avg('pressure'))['pressure__avg']
-            avg_temp = records.aggregate(Avg('temperature'))['temperature__avg']
-            
-            y_pos = height - 120
-            
-            # Title Section
-            p.setFont("Helvetica-Bold", 16)
-            p.setFillColorRGB(*GRAY_TEXT)
-            p.drawString(40, y_pos, "Executive Summary")
-            y_pos -= 10
-            
-            # --- KPI CARDS ---
-            card_y = y_pos - 70
-            card_width = 120
-            card_height = 60
-            gap = 15
-            
-            def draw_stat_box(x, title, value, unit, icon_color=(0.9, 0.9, 0.9)):
-                # Shadow effect
-                p.setFillColorRGB(0.95, 0.95, 0.95)
-                p.roundRect(x+2, card_y-2, card_width, card_height, 6, fill=1, stroke=0)
-                # Main box
-                p.setFillColorRGB(1, 1, 1)
-                p.setStrokeColorRGB(0.9, 0.9, 0.9)
-                p.roundRect(x, card_y, card_width, card_height, 6, fill=1, stroke=1)
-                
-                # Title
-                p.setFont("Helvetica", 9)
-                p.setFillColorRGB(*GRAY_SUB)
-                p.drawString(x + 12, card_y + 42, title)
-                
-                # Value
-                p.setFont("Helvetica-Bold", 18)
-                p.setFillColorRGB(*TEAL_MAIN)
-                p.drawString(x + 12, card_y + 18, str(value))
-                
-                # Unit
-                if unit:
-                    p.setFont("Helvetica-Bold", 9)
-                    p.setFillColorRGB(*GRAY_SUB)
-                    p.drawRightString(x + card_width - 12, card_y + 20, unit)
-
-            draw_stat_box(40, "Total Records", str(total), "")
-            draw_stat_box(40 + card_width + gap, "Avg Flowrate", f"{avg_flow:.1f}", "L/min")
-            draw_stat_box(40 + 2*(card_width + gap), "Avg Pressure", f"{avg_press:.1f}", "PSI")
-            draw_stat_box(40 + 3*(card_width + gap), "Avg Temp", f"{avg_temp:.1f}", "°C")
-
-            # --- GRAPHS ---
-            y_pos = card_y - 30
-            
-            df = pd.DataFrame(list(records.values('flowrate', 'pressure', 'temperature', 'equipment_type')))
-            
-            # Matplotlib Aesthetic Setup
-            plt.style.use('seaborn-v0_8-whitegrid')
-            
-            # 1. Trend Chart
-            fig, ax = plt.subplots(figsize=(8, 3.5))
-            ax.plot(df.index, df['flowrate'], label='Flowrate', color='#0d9488', linewidth=1.5, alpha=0.9)
-            ax.fill_between(df.index, df['flowrate'], color='#0d9488', alpha=0.1)
-            ax.plot(df.index, df['pressure'], label='Pressure', color='#f59e0b', linestyle='--', linewidth=1.5)
-            
-            ax.set_title('Process Trends Overview', fontsize=12, pad=10, fontweight='bold', color='#333333')
-            ax.legend(frameon=True, fontsize=9)
-            ax.set_ylabel('Value', fontsize=9)
-            ax.tick_params(axis='both', which='major', labelsize=8)
-            ax.margins(x=0)
-            
-            for spine in ax.spines.values():
-                spine.set_visible(False)
-            
-            plt.tight_layout()
-            
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            graph_height = 180
-            p.drawImage(ImageReader(img_buffer), 35, y_pos - graph_height, width=520, height=graph_height)
-            plt.close()
-            
-            y_pos -= (graph_height + 30)
+        return Response({
+            "dataset": dataset.id,
+            "mode": mode,
+            "bins": bins,
+            "histograms": histograms(dataset, metrics, bins, mode, by_type),
+        })
 
-            # 2. Side-by-Side: Distribution + Bar
-            # Distribution
-            fig2, (ax1, ax2) = plt.subplots(1, 2, figsize=(8, 3.5))
-            
-            counts = df['equipment_type'].value_counts()
-            colors = ['#0f766e', '#0d9488', '#14b8a6', '#2dd4bf', '#5eead4']
-            ax1.pie(counts, labels=counts.index, autopct='%1.1f%%', colors=colors[:len(counts)], 
-                   textprops={'fontsize': 8}, startangle=90, pctdistance=0.85)
-            # Draw circle for donut chart
-            centre_circle = plt.Circle((0,0),0.70,fc='white')
-            ax1.add_artist(centre_circle)
-            ax1.set_title('Equipment Distribution', fontsize=10, fontweight='bold')
-            
-            # Bar Chart (Avg Flow per Type)
-            avg_by_type = df.groupby('equipment_type')['flowrate'].mean()
-            ax2.bar(avg_by_type.index, avg_by_type.values, color='#0d9488', alpha=0.8, width=0.6)
-            ax2.set_title('Avg Flowrate by Type', fontsize=10, fontweight='bold')
-            ax2.tick_params(axis='x', rotation=45, labelsize=8)
-            ax2.grid(axis='y', linestyle='--', alpha=0.5)
-            for spine in ax2.spines.values():
-                spine.set_visible(False)
-            
-            plt.tight_layout()
-            img_buffer2 = io.BytesIO()
-            plt.savefig(img_buffer2, format='png', dpi=150, bbox_inches='tight')
-            img_buffer2.seek(0)
-            
-            graph_height_2 = 160
-            p.drawImage(ImageReader(img_buffer2), 35, y_pos - graph_height_2, width=520, height=graph_height_2)
-            plt.close()
+def report_response(dataset, charts_mode):
+    path = get_report(dataset, charts_mode)
+    
+    # Get filename
+    original_filename = dataset.file.name.split('/')[-1]
+    pdf_filename = original_filename.rsplit('.', 1)[0] + '_report.pdf'
+    
+    try:
+        report = open(path, 'rb')
+    except FileNotFoundError:
+        # Evicted by a concurrent prune between rendering and opening it
+        report = open(get_report(dataset, charts_mode), 'rb')
+    response = FileResponse(report, content_type='application/pdf',
+                            as_attachment=True, filename=pdf_filename)
+    response['ETag'] = report_etag(dataset, charts_mode)
+    return response
 
-            draw_footer(p, 1)
-            p.showPage()
-            
-            # --- PAGE 2: TABLE ---
-            # Header on new page
-            p.setFillColorRGB(*TEAL_MAIN)
-            p.rect(0, height - 60, width, 60, fill=1, stroke=0)
-            p.setFont("Helvetica-Bold", 18)
-            p.setFillColorRGB(1, 1, 1)
-            p.drawString(40, height - 40, "Detailed Equipment Logs")
-            
-            y = height - 100
-            
-            # Table Schema
-            cols = [
-                {"name": "Equipment Name", "x": 40, "w": 180},
-                {"name": "Type", "x": 220, "w": 100},
-                {"name": "Flow (L/min)", "x": 320, "w": 80},
-                {"name": "Press (PSI)", "x": 400, "w": 80},
-                {"name": "Temp (°C)", "x": 480, "w": 80},
-            ]
-            
-            # Draw Header Row
-            p.setFillColorRGB(*TEAL_MAIN)
-            p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
-            p.setFillColorRGB(1, 1, 1)
-            p.setFont("Helvetica-Bold", 9)
-            
-            for col in cols:
-                p.drawString(col["x"] + 10, y + 2, col["name"])
-            
-            y -= 25
-            page_num = 2
-            
-            p.setFont("Helvetica", 9)
-            p.setFillColorRGB(*GRAY_TEXT)
-            
-            for index, record in enumerate(records):
-                if y < 60:
-                    draw_footer(p, page_num)
-                    p.showPage()
-                    page_num += 1
-                    
-                    # Re-draw header on new page
-                    p.setFillColorRGB(*TEAL_MAIN)
-                    p.rect(0, height - 40, width, 40, fill=1, stroke=0)
-                    p.setFont("Helvetica-Bold", 14)
-                    p.setFillColorRGB(1, 1, 1)
-                    p.drawString(40, height - 28, "Detailed Equipment Logs (Cont.)")
-                    
-                    y = height - 80
-                    p.setFillColorRGB(*TEAL_MAIN)
-                    p.roundRect(40, y-5, 515, 25, 4, fill=1, stroke=0)
-                    p.setFillColorRGB(1, 1, 1)
-                    p.setFont("Helvetica-Bold", 9)
-                    for col in cols:
-                        p.drawString(col["x"] + 10, y + 2, col["name"])
-                    y -= 25
-                    p.setFont("Helvetica", 9)
+class DatasetPDFView(APIView):
+    """
+    GET renders the report within the request (or serves it from the cache).
+    POST queues it as a background job instead and answers 202 with the job;
+    poll reports/<job_id>/ and fetch reports/<job_id>/download/ once done.
+    ?charts=raster|vector picks PNG or vector charts (default REPORT_CHART_MODE).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def charts_mode(self):
+        mode = self.request.query_params.get('charts', settings.REPORT_CHART_MODE)
+        if mode not in CHART_MODES:
+            raise ValueError(f"charts must be one of: {', '.join(CHART_MODES)}")
+        return mode
 
-                # Row Background
-                if index % 2 == 0:
-                    p.setFillColorRGB(*TEAL_LIGHT)
-                    p.rect(40, y - 6, 515, 18, fill=1, stroke=0)
-                
-                # Cell Content
-                p.setFillColorRGB(*GRAY_TEXT)
-                p.drawString(cols[0]["x"] + 10, y, str(record.equipment_name)[:28])
-                p.drawString(cols[1]["x"] + 10, y, str(record.equipment_type))
-                p.drawString(cols[2]["x"] + 10, y, f"{record.flowrate:.1f}")
-                p.drawString(cols[3]["x"] + 10, y, f"{record.pressure:.1f}")
-                
-                # Conditional color for Temp
-                if record.temperature > 100:
-                    p.setFillColorRGB(0.8, 0.2, 0.2)
-                    p.setFont("Helvetica-Bold", 9)
-                p.drawString(cols[4]["x"] + 10, y, f"{record.temperature:.1f}")
-                
-                if record.temperature > 100:
-                    p.setFillColorRGB(*GRAY_TEXT)
-                    p.setFont("Helvetica", 9)
+    def get(self, request, id):
+        # A report rendered mid-ingest would be cached, and revalidated, as final
+        dataset = generics.get_object_or_404(Dataset, id=id, status=Dataset.Status.READY)
+        try:
+            mode = self.charts_mode()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        etag = report_etag(dataset, mode)
+        response = not_modified(request, etag, dataset.uploaded_at)
+        if response is not None:
+            return response
+        response = report_response(dataset, mode)
+        return set_validators(response, etag, dataset.uploaded_at)
 
-                y -= 20
-                
-            draw_footer(p, page_num)
+    def post(self, request, id):
+        dataset = generics.get_object_or_404(Dataset, id=id, status=Dataset.Status.READY)
+        try:
+            mode = self.charts_mode()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        job = enqueue(Job.Kind.REPORT, request.user, dataset=dataset, params={'charts': mode})
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        else:
-            p.setFont("Helvetica", 12)
-            p.drawString(40, height - 150, "No data records found in this dataset.")
+class ReportJobView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, job_id):
+        job = generics.get_object_or_404(Job, id=job_id, user=request.user, kind=Job.Kind.REPORT)
+        return Response(JobSerializer(job).data)
 
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        
-        # Get filename
-        dataset = Dataset.objects.get(id=id)
-        original_filename = dataset.file.name.split('/')[-1]
-        pdf_filename = original_filename.rsplit('.', 1)[0] + '_report.pdf'
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{pdf_filename}"'
-        return response
+class ReportDownloadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request, job_id):
+        job = generics.get_object_or_404(Job.objects.select_related('dataset'),
+                                         id=job_id, user=request.user, kind=Job.Kind.REPORT)
+        if job.status != Job.Status.DONE:
+            return Response({"error": "Report is not ready", "status": job.status},
+                            status=status.HTTP_409_CONFLICT)
+        # Normally a cache hit; re-renders if the file was evicted meanwhile
+        return report_response(job.dataset, job.params.get('charts', settings.REPORT_CHART_MODE))
@@ -0,0 +1,63 @@
+"""
+Report chart renders per second from several threads at once (see api/charts.py).
+
+Usage: python benchmark_charts.py [threads ...]   (default: 1 2 4 8)
+
+Each thread renders the trend and distribution charts of a synthetic dataset
+RENDERS times; every image is compared with a single-threaded reference, so
+a thread-safety problem shows up as a mismatch rather than just a slowdown.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api import charts
+
+RENDERS = 10
+POINTS = 1000
+
+
+def sample_data():
+    rng = np.random.default_rng(0)
+    x = list(range(POINTS))
+    flow = {'x': x, 'y': (120 + rng.normal(0, 15, POINTS).cumsum() / 10).tolist()}
+    press = {'x': x, 'y': (6 + rng.normal(0, 1, POINTS).cumsum() / 10).tolist()}
+    types = ['Pump', 'Valve', 'Compressor', 'Exchanger', 'Reactor']
+    distribution = dict(zip(types, rng.integers(50, 500, len(types)).tolist()))
+    flow_by_type = dict(zip(types, rng.uniform(50, 250, len(types)).tolist()))
+    return (flow, press), (distribution, flow_by_type)
+
+
+def render_all(trend_args, distribution_args):
+    return charts.trend_chart(*trend_args), charts.distribution_charts(*distribution_args)
+
+
+def worker(trend_args, distribution_args, reference):
+    mismatches = 0
+    for _ in range(RENDERS):
+        if render_all(trend_args, distribution_args) != reference:
+            mismatches += 1
+    return mismatches
+
+
+def main(thread_counts):
+    trend_args, distribution_args = sample_data()
+    reference = render_all(trend_args, distribution_args)
+
+    print(f"{'threads':>8} {'reports':>8} {'seconds':>8} {'reports/s':>10} {'mismatches':>11}")
+    for threads in thread_counts:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [pool.submit(worker, trend_args, distribution_args, reference)
+                       for _ in range(threads)]
+            mismatches = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - started
+        reports = threads * RENDERS
+        print(f"{threads:>8} {reports:>8} {elapsed:>8.2f} {reports / elapsed:>10.1f} {mismatches:>11}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8]
+    main(counts)
@@ -0,0 +1,92 @@
+"""
+Compare the legacy iterrows() ingest against api.ingest.ingest_csv.
+
+Usage: python benchmark_ingest.py [rows ...]   (default: 10000 100000 1000000)
+
+Runs against a throwaway test database, so the dev db.sqlite3 is untouched.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import connection
+
+from api.ingest import ingest_csv
+from api.models import Dataset, EquipmentName, EquipmentRecord, EquipmentType
+
+EQUIPMENT_TYPES = ["Pump", "Valve", "Tank", "Exchanger", "Mixer", "Pipe", "Reactor", "Separator"]
+
+
+def write_csv(path, rows):
+    rng = np.random.default_rng(42)
+    types = rng.choice(EQUIPMENT_TYPES, size=rows)
+    ids = rng.integers(100, 999, size=rows).astype(str)
+    pd.DataFrame({
+        "Equipment Name": np.char.add(np.char.add(types, "-"), ids),
+        "Type": types,
+        "Flowrate": rng.uniform(0, 400, rows).round(1),
+        "Pressure": rng.uniform(0, 20, rows).round(1),
+        "Temperature": rng.uniform(20, 120, rows).round(1),
+    }).to_csv(path, index=False)
+
+
+def legacy_ingest(dataset, path):
+    # The original DatasetUploadView loop, kept here as the baseline; only
+    # the label lookups were added once records stopped storing strings.
+    df = pd.read_csv(path)
+    name_ids = EquipmentName.ids_for(df['Equipment Name'])
+    type_ids = EquipmentType.ids_for(df['Type'])
+    records = []
+    for _, row in df.iterrows():
+        records.append(EquipmentRecord(
+            dataset=dataset,
+            equipment_name_id=name_ids[row['Equipment Name']],
+            equipment_type_id=type_ids[row['Type']],
+            flowrate=row['Flowrate'],
+            pressure=row['Pressure'],
+            temperature=row['Temperature']
+        ))
+    EquipmentRecord.objects.bulk_create(records)
+    return len(records)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main(sizes):
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user('bench', 'bench@example.com', 'bench')
+        dataset = Dataset.objects.create(user=user, file='datasets/bench.csv')
+
+        print(f"{'rows':>10} {'legacy s':>10} {'legacy r/s':>12} {'new s':>10} {'new r/s':>12} {'speedup':>8}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in sizes:
+                path = os.path.join(tmp, f"bench_{rows}.csv")
+                write_csv(path, rows)
+
+                legacy = timed(legacy_ingest, dataset, path)
+                EquipmentRecord.objects.filter(dataset=dataset).delete()
+                new = timed(ingest_csv, dataset, path)
+                EquipmentRecord.objects.filter(dataset=dataset).delete()
+
+                print(f"{rows:>10} {legacy:>10.2f} {rows / legacy:>12.0f} {new:>10.2f} {rows / new:>12.0f} {legacy / new:>7.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    main(sizes)
@@ -0,0 +1,96 @@
+"""
+Payload size and client parse time of datasets/<id>/data/: JSON vs columnar .npz.
+
+Usage: python benchmark_records_format.py [rows ...]   (default: 10000 100000 1000000)
+
+Runs against a throwaway test database and media directory.
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+
+from api.ingest import ingest_csv
+from api.models import Dataset
+from benchmark_ingest import write_csv
+
+NPZ = 'application/vnd.chemviz.columns+npz'
+
+
+def parse_json(content):
+    # What both clients do today
+    return pd.DataFrame(json.loads(content))
+
+
+def parse_npz(content):
+    # Same as columns_to_frame in desktop-frontend/ui/dashboard.py
+    with np.load(io.BytesIO(content), allow_pickle=False) as z:
+        return pd.DataFrame({
+            'id': z['id'],
+            'equipment_name': pd.Categorical.from_codes(z['equipment_name_codes'], z['equipment_name_labels']),
+            'equipment_type': pd.Categorical.from_codes(z['equipment_type_codes'], z['equipment_type_labels']),
+            'flowrate': z['flowrate'],
+            'pressure': z['pressure'],
+            'temperature': z['temperature'],
+            'dataset': int(z['dataset']),
+        })
+
+
+def best_of(fn, arg, repeat=3):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main(sizes):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user('bench', 'bench@example.com', 'bench')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        print(f"{'rows':>10} {'json MB':>9} {'npz MB':>8} {'json parse s':>13} {'npz parse s':>12} {'speedup':>8}")
+        with tempfile.TemporaryDirectory() as media:
+            settings.MEDIA_ROOT = media
+            os.makedirs(os.path.join(media, 'datasets'))
+            for rows in sizes:
+                name = f"datasets/bench_{rows}.csv"
+                csv_path = os.path.join(media, name)
+                write_csv(csv_path, rows)
+                dataset = Dataset.objects.create(user=user, file=name)
+                ingest_csv(dataset, csv_path)
+                url = f'/api/datasets/{dataset.id}/data/'
+
+                as_json = client.get(url).content
+                as_npz = client.get(url, HTTP_ACCEPT=NPZ).content
+                json_s = best_of(parse_json, as_json)
+                npz_s = best_of(parse_npz, as_npz)
+
+                print(f"{rows:>10} {len(as_json) / 1e6:>9.2f} {len(as_npz) / 1e6:>8.2f} "
+                      f"{json_s:>13.3f} {npz_s:>12.4f} {json_s / npz_s:>7.0f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    main(sizes)
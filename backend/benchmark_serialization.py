@@ -0,0 +1,76 @@
+"""
+Rows/second of datasets/<id>/data/ encoding: EquipmentRecordSerializer plus
+JSONRenderer against the values_list fast path (api.streaming.encode_records).
+
+Usage: python benchmark_serialization.py [rows ...]   (default: 10000 100000 1000000)
+
+Runs against a throwaway test database. Both timings include the query; the
+outputs are compared byte for byte.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from api.ingest import ingest_csv
+from api.models import Dataset, EquipmentRecord
+from api.serializers import EquipmentRecordSerializer
+from api.streaming import RECORD_COLUMNS, encode_records
+from benchmark_ingest import write_csv
+
+
+def serializer_encode(queryset):
+    # What DatasetRecordsView returned before the fast path
+    return JSONRenderer().render(EquipmentRecordSerializer(queryset, many=True).data)
+
+
+def query_only(queryset):
+    return list(queryset.values_list(*RECORD_COLUMNS))
+
+
+def best_of(fn, arg, repeat=3):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main(sizes):
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user('bench', 'bench@example.com', 'bench')
+
+        print(f"{'rows':>10} {'query r/s':>11} {'serializer r/s':>15} {'fast r/s':>10} {'speedup':>8} {'identical':>10}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in sizes:
+                path = os.path.join(tmp, f"bench_{rows}.csv")
+                write_csv(path, rows)
+                dataset = Dataset.objects.create(user=user, file='datasets/bench.csv')
+                ingest_csv(dataset, path)
+                queryset = (EquipmentRecord.objects.filter(dataset=dataset)
+                            .select_related('equipment_name', 'equipment_type').order_by('id'))
+
+                query, _ = best_of(query_only, queryset)
+                slow, expected = best_of(serializer_encode, queryset)
+                fast, actual = best_of(encode_records, queryset)
+
+                print(f"{rows:>10} {rows / query:>11.0f} {rows / slow:>15.0f} {rows / fast:>10.0f} "
+                      f"{slow / fast:>7.1f}x {str(actual == expected):>10}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    main(sizes)
@@ -57,7 +57,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -139,6 +139,57 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# CSV ingest
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '5000'))
+# Rows parsed per chunk when streaming an upload; 0 loads the whole file at once
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '50000'))
+
+# Rows fetched per DB round trip when streaming datasets/<id>/data/?stream=...
+RECORDS_STREAM_CHUNK_SIZE = int(os.getenv('RECORDS_STREAM_CHUNK_SIZE', '2000'))
+
+# Rendered PDF reports (see api/report_cache.py)
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', str(BASE_DIR / 'report_cache'))
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+# Rows listed in the report table; the rest are aggregated per type in an appendix (0 = no cap).
+# reportlab holds a whole report in memory while rendering, so this also bounds a render's memory
+REPORT_MAX_ROWS = int(os.getenv('REPORT_MAX_ROWS', '5000'))
+# Report charts as 'raster' (matplotlib PNGs) or 'vector' (reportlab drawings); ?charts= overrides
+REPORT_CHART_MODE = os.getenv('REPORT_CHART_MODE', 'raster')
+# Processes rendering report charts in parallel (see api/reports.py); 0 renders inline
+REPORT_PROCESSES = int(os.getenv('REPORT_PROCESSES', '2'))
+
+# Dataset retention, swept after each ingest and by `manage.py sweep_datasets`
+# (see api/retention.py). Newest datasets kept per user; 0 keeps all
+DATASET_RETENTION_KEEP = int(os.getenv('DATASET_RETENTION_KEEP', '5'))
+# Datasets older than this are swept regardless of count; 0 disables
+DATASET_RETENTION_MAX_AGE_DAYS = int(os.getenv('DATASET_RETENTION_MAX_AGE_DAYS', '0'))
+# Failed uploads are swept once this old, whatever the limits above
+DATASET_RETENTION_FAILED_HOURS = int(os.getenv('DATASET_RETENTION_FAILED_HOURS', '1'))
+# Datasets claimed and deleted per sweep round
+DATASET_RETENTION_BATCH_SIZE = int(os.getenv('DATASET_RETENTION_BATCH_SIZE', '50'))
+# Records removed per DELETE statement when a dataset is deleted
+RECORD_DELETE_BATCH_SIZE = int(os.getenv('RECORD_DELETE_BATCH_SIZE', '20000'))
+
+# Background jobs (see api/jobs.py)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Drain the queue from a thread pool inside the web process; set to False when
+# running dedicated `manage.py run_job_worker` processes instead
+JOB_RUN_IN_PROCESS = os.getenv('JOB_RUN_IN_PROCESS', 'True') == 'True'
+# A RUNNING job whose worker has not reported in for this long is taken to
+# have died (OOM, SIGKILL) and failed, its partial ingest removed
+JOB_STALE_MINUTES = int(os.getenv('JOB_STALE_MINUTES', '15'))
+
+# Server-sent dataset events, api/events/ (see api/events.py)
+# Seconds between reads of newly finished jobs, shared by all streams of a process
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '1'))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv('EVENTS_KEEPALIVE_SECONDS', '15'))
+EVENTS_RETRY_SECONDS = float(os.getenv('EVENTS_RETRY_SECONDS', '3'))
+# Under WSGI each stream holds a thread, so it ends after this long and the
+# client reconnects; kept well under gunicorn's 30s worker timeout
+EVENTS_SYNC_STREAM_SECONDS = float(os.getenv('EVENTS_SYNC_STREAM_SECONDS', '20'))
+# Seconds a signed ?ticket= from api/events/ticket/ can open a stream for
+EVENTS_TICKET_SECONDS = int(os.getenv('EVENTS_TICKET_SECONDS', '60'))
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
@@ -0,0 +1,23 @@
+"""
+Gunicorn profile serving the ASGI application (core/asgi.py), under which
+data/ sends its streaming bodies asynchronously (api.async_views) and
+events/ streams from one poller per process. The Dockerfile runs it:
+
+    gunicorn -c gunicorn_asgi.py
+
+Each uvicorn worker is one event loop holding any number of connections, so
+slow downloads and open event streams do not use up a fixed pool of worker
+threads the way they do under ``gunicorn core.wsgi:application``. Compare the
+two with loadtest.py.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'core.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# One event loop per core is enough; the database work runs on threads
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Seconds an idle keep-alive connection stays open
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+graceful_timeout = 30
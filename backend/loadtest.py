@@ -0,0 +1,163 @@
+"""
+Concurrent-connection capacity of the read endpoints, e.g. under WSGI
+(gunicorn core.wsgi:application) against ASGI (gunicorn -c gunicorn_asgi.py).
+
+Usage: python loadtest.py --token KEY --dataset ID [--concurrency 10,50,200]
+                          [--duration 10] [--slow 50] [--settle 15] URL [URL ...]
+
+Runs two phases against each server URL, which must hold the dataset:
+  load   C clients loop over datasets/, stats/ and data/ (gzip) for
+         ``--duration`` seconds, per concurrency level: requests/s, latency
+  slow   ``--slow`` clients start downloading the full data/ JSON and stop
+         reading, as slow clients do; once the server has filled their
+         socket buffers (``--settle`` seconds, longer on few cores), 10
+         clients time stats/
+
+Needs nothing beyond the standard library: requests are plain HTTP/1.1 over
+asyncio streams, one connection each.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from urllib.parse import urlsplit
+
+REQUEST_TIMEOUT = 10
+# Fast clients measured while the slow ones are stalled
+PROBES = 10
+
+
+class Target:
+    def __init__(self, url, token, dataset_id):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+        self.dataset_id = dataset_id
+
+    def request(self, path, **headers):
+        lines = [f"GET {self.prefix}/api/{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Authorization: Token {self.token}", "Connection: close"]
+        lines += [f"{name.replace('_', '-')}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    async def get(self, path, **headers):
+        """Fetch ``path`` to the end; returns the status code."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(self.request(path, **headers))
+            status = int((await reader.readline()).split()[1])
+            # Connection: close, so the body ends with the connection
+            while await reader.read(64 * 1024):
+                pass
+            return status
+        finally:
+            writer.close()
+
+    async def stall(self, path, stop):
+        """Start downloading ``path``, then stop reading until ``stop`` is set."""
+        sock = socket.socket()
+        # A small receive window, so the server soon blocks on the write
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (self.host, self.port))
+        reader, writer = await asyncio.open_connection(sock=sock)
+        try:
+            writer.write(self.request(path))
+            await reader.read(4096)
+            await stop.wait()
+        finally:
+            writer.close()
+
+
+class Timings:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    async def time(self, fetch):
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(fetch, REQUEST_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            self.errors += 1
+            return
+        if status == 200:
+            self.latencies.append(time.perf_counter() - started)
+        else:
+            self.errors += 1
+
+    def row(self, elapsed):
+        if not self.latencies:
+            return f"{0:>8} {0:>8.1f} {'-':>8} {'-':>8} {self.errors:>7}"
+        ordered = sorted(self.latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return (f"{len(ordered):>8} {len(ordered) / elapsed:>8.1f} {statistics.median(ordered) * 1000:>8.0f} "
+                f"{p99 * 1000:>8.0f} {self.errors:>7}")
+
+
+async def run_clients(clients, duration, fetches, timings):
+    deadline = time.monotonic() + duration
+
+    async def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            await timings.time(fetches[i % len(fetches)]())
+            i += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return time.monotonic() - started
+
+
+async def load_phase(target, levels, duration):
+    base = f"datasets/{target.dataset_id}"
+    fetches = [
+        lambda: target.get('datasets/'),
+        lambda: target.get(f"{base}/stats/"),
+        lambda: target.get(f"{base}/data/", Accept_Encoding='gzip'),
+    ]
+    print(f"{'clients':>8} {'ok':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for clients in levels:
+        timings = Timings()
+        elapsed = await run_clients(clients, duration, fetches, timings)
+        print(f"{clients:>8} {timings.row(elapsed)}")
+
+
+async def slow_phase(target, slow, duration, settle):
+    stop = asyncio.Event()
+    path = f"datasets/{target.dataset_id}/data/"
+    stalled = [asyncio.create_task(target.stall(path, stop)) for _ in range(slow)]
+    await asyncio.sleep(settle)
+    timings = Timings()
+    elapsed = await run_clients(PROBES, duration, [lambda: target.get(f"datasets/{target.dataset_id}/stats/")],
+                                timings)
+    stop.set()
+    await asyncio.gather(*stalled, return_exceptions=True)
+    print(f"{'stalled':>8} {'ok':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    print(f"{slow:>8} {timings.row(elapsed)}")
+
+
+async def main(args):
+    levels = [int(level) for level in args.concurrency.split(',')]
+    for url in args.urls:
+        target = Target(url, args.token, args.dataset)
+        print(f"\n{url}\n-- load: datasets/, stats/, data/ (gzip), {args.duration}s per level")
+        await load_phase(target, levels, args.duration)
+        print(f"-- slow: stats/ from {PROBES} clients while {args.slow} data/ downloads are stalled")
+        await slow_phase(target, args.slow, args.duration, args.settle)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', nargs='+', metavar='URL')
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--dataset', type=int, required=True)
+    parser.add_argument('--concurrency', default='10,50,200')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--slow', type=int, default=50)
+    parser.add_argument('--settle', type=float, default=15)
+    asyncio.run(main(parser.parse_args()))
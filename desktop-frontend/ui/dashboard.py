@@ -1,12 +1,16 @@
+import io
 import os
+from collections import OrderedDict
+
 import requests
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QTableWidget, QTableWidgetItem, 
                              QFileDialog, QTabWidget, QMessageBox, QListWidget, QListWidgetItem,
                              QFrame, QGridLayout, QHeaderView, QAbstractItemView, QStackedWidget, QScrollArea, QComboBox)
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtCore import Qt, QUrl, QTimer
 from PyQt5.QtGui import QColor, QBrush, QFont, QIcon, QDesktopServices
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -16,11 +20,62 @@ from config import API_URL
 # Set style
 plt.style.use('seaborn-v0_8-whitegrid')
 
+# Columnar records payload served by datasets/<id>/data/ (NumPy .npz archive)
+COLUMNAR_MEDIA_TYPE = 'application/vnd.chemviz.columns+npz'
+
+
+def columns_to_frame(content):
+    """Build the records DataFrame straight from the columnar payload's arrays."""
+    with np.load(io.BytesIO(content), allow_pickle=False) as z:
+        return pd.DataFrame({
+            'id': z['id'],
+            'equipment_name': pd.Categorical.from_codes(z['equipment_name_codes'], z['equipment_name_labels']),
+            'equipment_type': pd.Categorical.from_codes(z['equipment_type_codes'], z['equipment_type_labels']),
+            'flowrate': z['flowrate'],
+            'pressure': z['pressure'],
+            'temperature': z['temperature'],
+            'dataset': int(z['dataset']),
+        })
+
+class ConditionalClient:
+    """
+    GETs that send back the ETag / Last-Modified of the last response for the
+    same request. Datasets never change once uploaded, so the server usually
+    answers 304 and the stored response is returned instead of downloaded again.
+    """
+    MAX_RESPONSES = 32
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.responses = OrderedDict()
+
+    def get(self, url, headers=None):
+        headers = {**self.headers, **(headers or {})}
+        key = (url, headers.get('Accept'))
+        cached = self.responses.get(key)
+        if cached is not None:
+            if 'ETag' in cached.headers:
+                headers['If-None-Match'] = cached.headers['ETag']
+            if 'Last-Modified' in cached.headers:
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+
+        resp = requests.get(url, headers=headers)
+        if resp.status_code == 304 and cached is not None:
+            self.responses.move_to_end(key)
+            return cached
+        if resp.status_code == 200 and ('ETag' in resp.headers or 'Last-Modified' in resp.headers):
+            self.responses[key] = resp
+            self.responses.move_to_end(key)
+            if len(self.responses) > self.MAX_RESPONSES:
+                self.responses.popitem(last=False)
+        return resp
+
 class MainWindow(QMainWindow):
     def __init__(self, token):
         super().__init__()
         self.token = token
         self.headers = {'Authorization': f'Token {token}'}
+        self.http = ConditionalClient(self.headers)
         self.setWindowTitle("ChemViz Desktop")
         self.resize(1400, 900)
         
@@ -261,7 +316,7 @@ class MainWindow(QMainWindow):
 
     def refresh_datasets(self):
         try:
-            resp = requests.get(API_URL + "datasets/", headers=self.headers)
+            resp = self.http.get(API_URL + "datasets/")
             if resp.status_code == 200:
                 self.list_datasets.clear()
                 data = resp.json()
@@ -282,13 +337,65 @@ class MainWindow(QMainWindow):
             files = {'file': open(file_path, 'rb')}
             try:
                 resp = requests.post(API_URL + "upload/", headers=self.headers, files=files)
-                if resp.status_code == 201:
-                    QMessageBox.information(self, "Success", "File uploaded successfully.")
-                    self.refresh_datasets()
+                if resp.status_code in (201, 202):
+                    self.watch_ingest(resp.json().get('id'), lambda _: (
+                        QMessageBox.information(self, "Success", "File uploaded successfully.")
+                    ))
                 else:
                     QMessageBox.warning(self, "Upload Failed", resp.text)
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
+
+    def watch_ingest(self, dataset_id, on_ready):
+        """Poll the ingest status of an upload without blocking the UI, then refresh."""
+        self.btn_upload.setEnabled(False)
+        self.btn_upload.setText("Processing...")
+
+        def finish():
+            timer.stop()
+            self.btn_upload.setEnabled(True)
+            self.btn_upload.setText("Upload New CSV")
+
+        def poll():
+            try:
+                resp = requests.get(f"{API_URL}datasets/{dataset_id}/status/", headers=self.headers)
+            except Exception as e:
+                print(f"Error polling ingest status: {e}")
+                return
+            if resp.status_code == 404:
+                # No ingest job on record (e.g. since pruned): nothing left to wait for
+                job = {'status': 'done'}
+            elif resp.status_code == 200:
+                job = resp.json()
+            else:
+                finish()
+                QMessageBox.warning(self, "Upload Status Unknown",
+                                    f"Could not check processing status ({resp.status_code}):\n{resp.text}")
+                return
+            if job['status'] == 'done':
+                finish()
+                self.refresh_datasets()
+                on_ready(dataset_id)
+            elif job['status'] == 'failed':
+                finish()
+                QMessageBox.warning(self, "Upload Failed", job.get('error') or "Processing failed.")
+            else:
+                total = job.get('rows_total')
+                if total:
+                    self.btn_upload.setText(f"Processing... {job['rows_processed']}/{total}")
+
+        timer = QTimer(self)
+        timer.timeout.connect(poll)
+        timer.start(1000)
+        poll()
+
+    def select_dataset(self, dataset_id):
+        for i in range(self.list_datasets.count()):
+            item = self.list_datasets.item(i)
+            if item.data(Qt.UserRole) == dataset_id:
+                self.list_datasets.setCurrentItem(item)
+                self.load_dataset(item)
+                break
     
     def load_sample_dataset(self):
         """Upload the sample dataset and automatically load it"""
@@ -307,23 +414,13 @@ class MainWindow(QMainWindow):
             files = {'file': open(sample_path, 'rb')}
             resp = requests.post(API_URL + "upload/", headers=self.headers, files=files)
             
-            if resp.status_code == 201:
-                # Refresh dataset list
-                self.refresh_datasets()
-                
-                # Auto-select the newly uploaded dataset
-                # Get the new dataset ID from response
-                new_dataset_id = resp.json().get('id')
-                if new_dataset_id:
-                    # Find and select the item in the list
-                    for i in range(self.list_datasets.count()):
-                        item = self.list_datasets.item(i)
-                        if item.data(Qt.UserRole) == new_dataset_id:
-                            self.list_datasets.setCurrentItem(item)
-                            self.load_dataset(item)
-                            break
-                
-                QMessageBox.information(self, "Success", "Sample dataset loaded successfully!")
+            if resp.status_code in (201, 202):
+                def on_ready(new_dataset_id):
+                    # Auto-select the newly uploaded dataset
+                    self.select_dataset(new_dataset_id)
+                    QMessageBox.information(self, "Success", "Sample dataset loaded successfully!")
+
+                self.watch_ingest(resp.json().get('id'), on_ready)
             else:
                 QMessageBox.warning(self, "Upload Failed", resp.text)
         except Exception as e:
@@ -351,16 +448,20 @@ class MainWindow(QMainWindow):
 
     def load_data(self, id):
         try:
-            resp = requests.get(f"{API_URL}datasets/{id}/data/", headers=self.headers)
+            resp = self.http.get(f"{API_URL}datasets/{id}/data/", headers={
+                # Alone: DRF ranks a parameterised 'application/json;q=...' above it
+                'Accept': COLUMNAR_MEDIA_TYPE,
+            })
             if resp.status_code == 200:
-                data = resp.json()
-                if isinstance(data, dict) and 'results' in data: 
-                    data = data['results']
-                
-                # Create DataFrame for Analysis
-                self.df = pd.DataFrame(data)
+                if resp.headers.get('Content-Type', '').startswith(COLUMNAR_MEDIA_TYPE):
+                    self.df = columns_to_frame(resp.content)
+                else:
+                    data = resp.json()
+                    if isinstance(data, dict) and 'results' in data: 
+                        data = data['results']
+                    self.df = pd.DataFrame(data)
                 
-                self.table.setRowCount(len(data))
+                self.table.setRowCount(len(self.df))
                 self.table.setColumnCount(5)
                 self.table.setHorizontalHeaderLabels(["EQUIPMENT NAME", "TYPE", "FLOWRATE (L/min)", "PRESSURE (PSI)", "TEMP (°C)"])
                 
@@ -368,15 +469,19 @@ class MainWindow(QMainWindow):
                 header.setSectionResizeMode(0, QHeaderView.Stretch)
                 header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
                 
-                for i, row in enumerate(data):
-                    self.table.setItem(i, 0, QTableWidgetItem(str(row['equipment_name'])))
-                    type_item = QTableWidgetItem(str(row['equipment_type']))
+                if self.df.empty:
+                    return
+                rows = zip(self.df['equipment_name'], self.df['equipment_type'],
+                           self.df['flowrate'], self.df['pressure'], self.df['temperature'])
+                for i, (name, eq_type, flow, press, temp) in enumerate(rows):
+                    self.table.setItem(i, 0, QTableWidgetItem(str(name)))
+                    type_item = QTableWidgetItem(str(eq_type))
                     type_item.setTextAlignment(Qt.AlignCenter)
                     self.table.setItem(i, 1, type_item)
-                    self.table.setItem(i, 2, QTableWidgetItem(f"{row['flowrate']:.1f}"))
-                    self.table.setItem(i, 3, QTableWidgetItem(f"{row['pressure']:.1f}"))
-                    temp_item = QTableWidgetItem(f"{row['temperature']:.1f}")
-                    if row['temperature'] > 100:
+                    self.table.setItem(i, 2, QTableWidgetItem(f"{flow:.1f}"))
+                    self.table.setItem(i, 3, QTableWidgetItem(f"{press:.1f}"))
+                    temp_item = QTableWidgetItem(f"{temp:.1f}")
+                    if temp > 100:
                         temp_item.setForeground(QBrush(QColor('#ef4444'))) 
                         temp_item.setFont(QFont("Segoe UI", 9, QFont.Bold))
                     self.table.setItem(i, 4, temp_item)
@@ -385,7 +490,7 @@ class MainWindow(QMainWindow):
 
     def load_stats(self, id):
         try:
-            resp = requests.get(f"{API_URL}datasets/{id}/stats/", headers=self.headers)
+            resp = self.http.get(f"{API_URL}datasets/{id}/stats/")
             if resp.status_code == 200:
                  stats = resp.json()
                  
@@ -504,15 +609,15 @@ class MainWindow(QMainWindow):
                  trend_fig.patch.set_facecolor('white')
                  trend_canvas = FigureCanvas(trend_fig)
                  
-                 if self.df is not None and not self.df.empty:
+                 trend = self.fetch_trend(id)
+                 if trend:
                     ax_trend = trend_fig.add_subplot(111)
-                    flow = self.df['flowrate']
-                    press = self.df['pressure']
-                    x = range(len(self.df))
+                    flow = trend['flowrate']
+                    press = trend['pressure']
                     
-                    ax_trend.plot(x, flow, label='Flowrate', color='#0d9488', linewidth=2)
-                    ax_trend.fill_between(x, flow, color='#0d9488', alpha=0.1)
-                    ax_trend.plot(x, press, label='Pressure', color='#f59e0b', linestyle='--', linewidth=2)
+                    ax_trend.plot(flow['x'], flow['y'], label='Flowrate', color='#0d9488', linewidth=2)
+                    ax_trend.fill_between(flow['x'], flow['y'], color='#0d9488', alpha=0.1)
+                    ax_trend.plot(press['x'], press['y'], label='Pressure', color='#f59e0b', linestyle='--', linewidth=2)
                     
                     ax_trend.set_facecolor('white')
                     ax_trend.grid(True, linestyle=':', alpha=0.6)
@@ -567,6 +672,14 @@ class MainWindow(QMainWindow):
             if 'resp' in locals():
                 print(f"Response Content: {resp.text}")
 
+    def fetch_trend(self, id, points=800):
+        """Server-downsampled flowrate/pressure series for the trend chart."""
+        resp = requests.get(f"{API_URL}datasets/{id}/trend/", headers=self.headers,
+                            params={'points': points, 'metrics': 'flowrate,pressure'})
+        if resp.status_code != 200:
+            return None
+        return resp.json()['series']
+
     def update_bar_chart(self, metric_text):
         if self.df is None or self.df.empty: return
         
@@ -576,7 +689,7 @@ class MainWindow(QMainWindow):
         self.lbl_bar_title.setText(f"Average {metric_text} by Equipment")
         
         # Aggregate logic
-        avg_df = self.df.groupby("equipment_type")[metric].mean()
+        avg_df = self.df.groupby("equipment_type", observed=True)[metric].mean()
         
         self.bar_fig.clear()
         ax = self.bar_fig.add_subplot(111)
@@ -619,7 +732,7 @@ class MainWindow(QMainWindow):
     def download_pdf(self):
         if not self.current_dataset_id: return
         try:
-            resp = requests.get(f"{API_URL}datasets/{self.current_dataset_id}/pdf/", headers=self.headers)
+            resp = self.http.get(f"{API_URL}datasets/{self.current_dataset_id}/pdf/")
             if resp.status_code == 200:
                 # Construct default filename: filename.csv -> filename_report.pdf
                 bg_filename = getattr(self, 'current_dataset_filename', f'dataset_{self.current_dataset_id}')
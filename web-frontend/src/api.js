@@ -17,4 +17,11 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+// Server-sent dataset events (api/events/). EventSource cannot set headers, so
+// it connects with a short-lived ticket rather than putting the token in the URL.
+export const openEvents = async () => {
+    const res = await api.post('api/events/ticket/');
+    return new EventSource(`${API_URL}api/events/?ticket=${encodeURIComponent(res.data.ticket)}`);
+};
+
 export default api;
@@ -59,6 +59,15 @@ export default function Dashboard({ onSelect }) {
         }
     };
 
+    const waitForIngest = async (datasetId) => {
+        while (true) {
+            const { data: job } = await api.get(`api/datasets/${datasetId}/status/`);
+            if (job.status === 'done') return;
+            if (job.status === 'failed') throw new Error(job.error || 'Processing failed');
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    };
+
     const handleUpload = async (e) => {
         e.preventDefault();
         if (!file) return;
@@ -68,12 +77,17 @@ export default function Dashboard({ onSelect }) {
 
         setUploading(true);
         try {
-            await Promise.all([
+            const [res] = await Promise.all([
                 api.post('api/upload/', formData, {
                     headers: { 'Content-Type': 'multipart/form-data' }
                 }),
                 new Promise(resolve => setTimeout(resolve, 2000)) // Artificial delay for UX
             ]);
+
+            // Ingest runs in the background; wait for the job to finish
+            if (res.status === 202) {
+                await waitForIngest(res.data.id);
+            }
             
             setFile(null);
             if (activeTab === 'my') fetchDatasets();
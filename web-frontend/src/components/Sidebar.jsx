@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import api from '../api';
+import api, { openEvents } from '../api';
 
 export default function Sidebar({ isOpen, toggle, onLogout, onViewChange, currentView, selectedDatasetId, onSelectDataset, onUploadClick }) {
     const [datasets, setDatasets] = useState([]);
@@ -14,12 +14,42 @@ export default function Sidebar({ isOpen, toggle, onLogout, onViewChange, curren
             }
         };
         fetchDatasets();
-        // Poll for updates every 10s or rely on parent to trigger refresh
-        const interval = setInterval(fetchDatasets, 10000);
-        return () => clearInterval(interval);
+        // Refetch only when the server reports a change to the list
+        let events = null;
+        let retry = null;
+        let closed = false;
+        const reconnect = () => {
+            if (!closed) retry = setTimeout(connect, 3000);
+        };
+        const connect = async () => {
+            try {
+                events = await openEvents();
+            } catch (err) {
+                console.error(err);
+                reconnect();
+                return;
+            }
+            if (closed) {
+                events.close();
+                return;
+            }
+            events.addEventListener('datasets', fetchDatasets);
+            // Changes made before the stream (re)connected were not sent; catch up
+            events.onopen = fetchDatasets;
+            // The ticket may have expired, so reconnect with a new one
+            events.onerror = () => {
+                events.close();
+                reconnect();
+            };
+        };
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            if (events) events.close();
+        };
     }, []);
 
-    // Also expose a refresh method if needed, but polling is simple for now
     
     return (
         <>